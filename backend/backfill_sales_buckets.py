@@ -0,0 +1,17 @@
+import argparse
+import asyncio
+
+from server import BACKFILL_BATCH_SIZE, backfill_sales_buckets, client
+
+
+async def main(batch_size: int):
+    result = await backfill_sales_buckets(batch_size)
+    print(f"Rebuilt {result['buckets']} sales buckets from {result['orders']} orders")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild hourly/daily sales buckets from the orders collection")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
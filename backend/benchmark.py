@@ -0,0 +1,621 @@
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+CATEGORIES = [
+    "LED Signs", "Neon", "Light Boxes", "Banners", "Vinyl Prints", "Acrylic",
+    "Metal Letters", "Roll-ups", "Stands", "Stickers", "Billboards", "Displays",
+]
+WORDS = [
+    "led", "neon", "banner", "acrylic", "light", "box", "vinyl", "print", "outdoor", "indoor",
+    "custom", "metal", "letter", "frame", "panel", "backlit", "sign", "roll", "stand", "poster",
+    "wall", "window", "shop", "street", "menu", "logo", "double", "sided", "waterproof", "slim",
+]
+ORDER_STATUSES = [("delivered", 40), ("shipped", 10), ("processing", 10), ("pending", 25), ("cancelled", 15)]
+PAID_STATUSES = {"delivered", "shipped", "processing"}
+SEED_BATCH_SIZE = 10000
+BENCH_ADMIN_EMAIL = "bench@example.com"
+BENCH_CUSTOMER_EMAIL = "loadtest@example.com"
+# bump when the seeded layout changes so older databases are rebuilt
+SEED_VERSION = 2
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# must stay out of a cold worker; they are imported lazily by the routes that need them
+HEAVY_MODULES = ["pandas", "stripe", "emergentintegrations", "openpyxl", "PIL"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed a benchmark database and load-test the API hot paths")
+    parser.add_argument("--db-name", default=os.environ.get("BENCH_DB_NAME", "reklama_bench"),
+                        help="dedicated database to seed and run against; never point this at production")
+    parser.add_argument("--base-url", help="drive a running server instead of the app in-process")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--sessions", type=int, default=20000, help="paid checkout sessions to seed for payment status")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reseed", action="store_true", help="drop and rebuild the benchmark database")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of scenarios")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds per scenario")
+    parser.add_argument("--import-runs", type=int, default=3)
+    parser.add_argument("--import-rows", type=int, default=2000)
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's results as JSON")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed relative regression of p95 latency or throughput before failing")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="only profile a fresh worker's imports and time to first ready request")
+    parser.add_argument("--cold-start-budget", type=float,
+                        default=float(os.environ.get("COLD_START_BUDGET", "3.0")),
+                        help="seconds a fresh worker may take to answer its first request")
+    parser.add_argument("--serialization", action="store_true",
+                        help="only time list encoding and compression offline, without a database")
+    parser.add_argument("--serialization-orders", type=int, default=500)
+    parser.add_argument("--serialization-runs", type=int, default=50)
+    return parser.parse_args()
+
+
+# ===================== SEEDING =====================
+
+def make_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_product(rng: random.Random, index: int, sort_gap: int, created_at: str) -> Dict[str, Any]:
+    name_words = rng.sample(WORDS, 3)
+    return {
+        "id": make_uuid(rng),
+        "name": " ".join(word.capitalize() for word in name_words) + f" {index}",
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 60))),
+        "price": round(rng.uniform(5, 2500), 2),
+        "category": rng.choice(CATEGORIES),
+        # deep stock so order creation never runs dry mid-benchmark
+        "quantity": 1_000_000,
+        "sku": f"BENCH-{index:06d}",
+        "image_url": "",
+        "sort_order": (index + 1) * sort_gap,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def make_order(rng: random.Random, index: int, products: List[Dict[str, Any]], now: datetime) -> Dict[str, Any]:
+    status = rng.choices([s for s, _ in ORDER_STATUSES], weights=[w for _, w in ORDER_STATUSES])[0]
+    created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+    items = []
+    for product in rng.sample(products, rng.randint(1, 4)):
+        items.append({
+            "product_id": product["id"],
+            "name": product["name"],
+            "price": product["price"],
+            "quantity": rng.randint(1, 5),
+        })
+    paid = status in PAID_STATUSES
+    order = {
+        "id": make_uuid(rng),
+        "items": items,
+        "total_amount": round(sum(item["price"] * item["quantity"] for item in items), 2),
+        "customer_name": f"Customer {index}",
+        "customer_email": f"customer{index}@example.com",
+        "customer_phone": f"+99890{index % 10_000_000:07d}",
+        "customer_address": " ".join(rng.choices(WORDS, k=8)),
+        "status": status,
+        "payment_status": "paid" if paid else "unpaid",
+        "payment_session_id": f"cs_bench_{index}" if paid else "",
+        "stock_reserved": False,
+        "created_at": created.isoformat(),
+        "updated_at": created.isoformat(),
+    }
+    if paid:
+        order["paid_at"] = (created + timedelta(minutes=rng.randint(1, 30))).isoformat()
+    return order
+
+
+async def seed(server, args) -> None:
+    db = server.db
+    spec = {"products": args.products, "orders": args.orders, "sessions": args.sessions, "seed": args.seed,
+            "version": SEED_VERSION}
+    meta = await db.bench_meta.find_one({"_id": "seed"})
+    if meta and meta.get("spec") == spec and not args.reseed:
+        print(f"Reusing seeded database '{args.db_name}'")
+        return
+    existing = await db.list_collection_names()
+    if existing and not meta:
+        sys.exit(f"Database '{args.db_name}' has data but was not seeded by this tool; refusing to drop it")
+
+    started = time.perf_counter()
+    await server.client.drop_database(args.db_name)
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+
+    products = [make_product(rng, i, server.SORT_GAP, now.isoformat()) for i in range(args.products)]
+    for offset in range(0, len(products), SEED_BATCH_SIZE):
+        await db.products.insert_many([dict(p) for p in products[offset:offset + SEED_BATCH_SIZE]], ordered=False)
+    print(f"Seeded {len(products)} products")
+
+    sessions = 0
+    for offset in range(0, args.orders, SEED_BATCH_SIZE):
+        orders = [make_order(rng, i, products, now) for i in range(offset, min(offset + SEED_BATCH_SIZE, args.orders))]
+        await db.orders.insert_many(orders, ordered=False)
+        transactions = []
+        for order in orders:
+            if order["payment_session_id"] and sessions < args.sessions:
+                sessions += 1
+                transactions.append({
+                    "id": make_uuid(rng),
+                    "session_id": order["payment_session_id"],
+                    "order_id": order["id"],
+                    "amount": order["total_amount"],
+                    "currency": "usd",
+                    "status": "complete",
+                    "payment_status": "paid",
+                    "amount_total": int(round(order["total_amount"] * 100)),
+                    "created_at": order["created_at"],
+                })
+        if transactions:
+            await db.payment_transactions.insert_many(transactions, ordered=False)
+        print(f"Seeded {min(offset + SEED_BATCH_SIZE, args.orders)}/{args.orders} orders", end="\r")
+    print()
+
+    await db.admins.insert_one({
+        "id": make_uuid(rng),
+        "email": BENCH_ADMIN_EMAIL,
+        "name": "Benchmark",
+        "password": server.hash_password_sync(uuid.uuid4().hex),
+        "created_at": now.isoformat(),
+    })
+    # pristine copy of the catalog; reset_mutations restores it around every run
+    await db.products.aggregate([{"$out": "bench_products_seed"}]).to_list(None)
+    await server.ensure_indexes()
+    await server.rebuild_analytics_rollup()
+    await server.backfill_sales_buckets()
+    await db.bench_meta.replace_one({"_id": "seed"}, {"_id": "seed", "spec": spec, "seeded_at": now.isoformat()}, upsert=True)
+    print(f"Seeding finished in {time.perf_counter() - started:.1f}s")
+
+
+async def reset_mutations(server) -> None:
+    # order_create reserves stock and excel_import rewrites products; undo both so every
+    # run starts from the seeded state and baselines stay comparable
+    db = server.db
+    removed = await db.orders.delete_many({"customer_email": BENCH_CUSTOMER_EMAIL})
+    await db.bench_products_seed.aggregate([
+        {"$merge": {"into": "products", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+    seeded_ids = await db.bench_products_seed.distinct("_id")
+    await db.products.delete_many({"_id": {"$nin": seeded_ids}})
+    server.product_catalog_changed()
+    if removed.deleted_count:
+        print(f"Removed {removed.deleted_count} benchmark orders and restored seeded products")
+
+
+# ===================== SCENARIOS =====================
+
+class Fixtures:
+    def __init__(self, product_ids: List[str], skus: List[str], session_ids: List[str], admin_token: str):
+        self.product_ids = product_ids
+        self.skus = skus
+        self.session_ids = session_ids
+        self.admin_headers = {"Authorization": f"Bearer {admin_token}"}
+
+
+async def load_fixtures(server) -> Fixtures:
+    products = await server.db.products.find({}, {"_id": 0, "id": 1, "sku": 1}).to_list(None)
+    sessions = await server.db.payment_transactions.find({"payment_status": "paid"}, {"_id": 0, "session_id": 1}).to_list(None)
+    return Fixtures(
+        [p["id"] for p in products],
+        [p["sku"] for p in products if p.get("sku")],
+        [s["session_id"] for s in sessions],
+        server.create_token(BENCH_ADMIN_EMAIL),
+    )
+
+
+def products_list(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    params = {"view": "grid", "limit": 50}
+    if rng.random() < 0.5:
+        params["category"] = rng.choice(CATEGORIES)
+    return {"method": "GET", "url": "/api/products", "params": params}
+
+
+def products_search(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    return {"method": "GET", "url": "/api/products", "params": {"search": " ".join(rng.sample(WORDS, rng.randint(1, 2)))}}
+
+
+def product_detail(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    return {"method": "GET", "url": f"/api/products/{rng.choice(fx.product_ids)}"}
+
+
+def cart_lookup(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    ids = rng.sample(fx.product_ids, min(30, len(fx.product_ids)))
+    return {"method": "GET", "url": "/api/products/lookup", "params": {"ids": ",".join(ids)}}
+
+
+def order_create(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    items = [
+        {"product_id": product_id, "name": "", "price": 0, "quantity": rng.randint(1, 3)}
+        for product_id in rng.sample(fx.product_ids, rng.randint(1, 3))
+    ]
+    return {"method": "POST", "url": "/api/orders", "json": {
+        "items": items,
+        "customer_name": "Load Test",
+        "customer_email": BENCH_CUSTOMER_EMAIL,
+        "customer_phone": "+998900000000",
+        "customer_address": "Benchmark street 1",
+    }}
+
+
+def payment_status(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    return {"method": "GET", "url": f"/api/payments/status/{rng.choice(fx.session_ids)}"}
+
+
+def analytics(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    return {"method": "GET", "url": "/api/analytics", "headers": fx.admin_headers}
+
+
+def analytics_sales(rng: random.Random, fx: Fixtures) -> Dict[str, Any]:
+    return {"method": "GET", "url": "/api/analytics/sales", "params": {"granularity": rng.choice(["hour", "day"])},
+            "headers": fx.admin_headers}
+
+
+SCENARIOS: Dict[str, Optional[Callable]] = {
+    "products_list": products_list,
+    "products_search": products_search,
+    "product_detail": product_detail,
+    "cart_lookup": cart_lookup,
+    "order_create": order_create,
+    "payment_status": payment_status,
+    "analytics": analytics,
+    "analytics_sales": analytics_sales,
+    # end-to-end job timing, driven by run_excel_import
+    "excel_import": None,
+}
+# leave writes behind; the seeded state is restored after each of these
+MUTATING_SCENARIOS = {"order_create", "excel_import"}
+
+
+# ===================== RUNNER =====================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+async def drive(http: httpx.AsyncClient, factory: Callable, fx: Fixtures, concurrency: int,
+                seconds: float, seed: int, record: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            request = factory(rng, fx)
+            started = time.perf_counter()
+            try:
+                response = await http.request(**request)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started) if record else {}
+
+
+def build_import_workbook(skus: List[str], rows: int, rng: random.Random) -> bytes:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("products")
+    sheet.append(["name", "description", "price", "category", "quantity", "sku"])
+    for sku in rng.sample(skus, min(rows, len(skus))):
+        sheet.append([
+            " ".join(rng.sample(WORDS, 3)).title(),
+            " ".join(rng.choices(WORDS, k=30)),
+            round(rng.uniform(5, 2500), 2),
+            rng.choice(CATEGORIES),
+            1_000_000,
+            sku,
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+async def run_excel_import(http: httpx.AsyncClient, fx: Fixtures, args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    payload = build_import_workbook(fx.skus, args.import_rows, rng)
+    latencies: List[float] = []
+    errors = 0
+    started_all = time.perf_counter()
+    for _ in range(args.import_runs):
+        started = time.perf_counter()
+        response = await http.post(
+            "/api/products/upload-excel",
+            files={"file": ("bench.xlsx", payload, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+            headers=fx.admin_headers,
+        )
+        if response.status_code >= 400:
+            errors += 1
+            continue
+        job_id = response.json()["job_id"]
+        while True:
+            await asyncio.sleep(0.05)
+            job = (await http.get(f"/api/products/import-jobs/{job_id}", headers=fx.admin_headers)).json()
+            if job.get("status") in ("completed", "failed"):
+                break
+        latencies.append(time.perf_counter() - started)
+        errors += job.get("status") == "failed"
+    result = summarize(latencies, errors, time.perf_counter() - started_all)
+    result["rows_per_run"] = min(args.import_rows, len(fx.skus))
+    return result
+
+
+# ===================== COLD START =====================
+
+def profile_imports(env: Dict[str, str]) -> Dict[str, Any]:
+    probe = "import json, sys, server; print(json.dumps(sorted(m for m in %r if m in sys.modules)))" % HEAVY_MODULES
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        sys.exit(f"Importing server failed:\n{proc.stderr[-2000:]}")
+    # -X importtime lines: "import time: self [us] | cumulative | imported package",
+    # nested two spaces per level; server's own imports sit one level below it
+    direct: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        if (len(package) - len(package.lstrip())) == 3:
+            name = package.strip().split(".")[0]
+            direct[name] = direct.get(name, 0) + int(cumulative)
+    slowest = sorted(direct.items(), key=lambda item: item[1], reverse=True)[:15]
+    return {
+        "import_wall_s": round(wall, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+        "heavy_modules_loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def time_to_first_request(env: Dict[str, str], timeout: float = 60.0) -> float:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=BACKEND_DIR, env=env)
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                sys.exit(f"uvicorn exited with status {proc.returncode} before serving")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        sys.exit(f"No ready response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run_cold_start(args) -> int:
+    env = {**os.environ, "DB_NAME": args.db_name}
+    result = profile_imports(env)
+    result["first_request_s"] = round(time_to_first_request(env), 3)
+    result["budget_s"] = args.cold_start_budget
+    print(f"import server: {result['import_wall_s']}s wall, max RSS {result['max_rss_mb']} MB")
+    for name, ms in result["slowest_imports_ms"].items():
+        print(f"  {name:<28}{ms:>10} ms")
+    print(f"first ready request after {result['first_request_s']}s (budget {args.cold_start_budget}s)")
+
+    failures = []
+    if result["heavy_modules_loaded"]:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules_loaded'])}")
+    if result["first_request_s"] > args.cold_start_budget:
+        failures.append(f"first request {result['first_request_s'] - args.cold_start_budget:.3f}s over the "
+                        f"{args.cold_start_budget}s budget")
+    result["passed"] = not failures
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cold_start": result}, f, indent=2)
+
+    if failures:
+        print("\nCold start FAILED:", file=sys.stderr)
+        for line in failures:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("\nCold start within budget")
+    return 0
+
+
+# ===================== SERIALIZATION =====================
+
+def time_encoder(encode: Callable[[], bytes], runs: int) -> Dict[str, Any]:
+    body = encode()
+    started = time.perf_counter()
+    for _ in range(runs):
+        encode()
+    return {"mean_ms": round((time.perf_counter() - started) / runs * 1000, 2), "bytes": len(body)}
+
+
+def run_serialization(args) -> int:
+    os.environ["DB_NAME"] = args.db_name
+    import server
+    from fastapi.encoders import jsonable_encoder
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    created_at = now.isoformat()
+    products = [make_product(rng, index, 1000, created_at) for index in range(max(args.serialization_orders, 50))]
+    orders = [make_order(rng, index, products, now) for index in range(args.serialization_orders)]
+    grid_fields = [field for field, keep in server.PRODUCT_VIEWS["grid"].items() if keep and field != "_id"]
+    grid = server.trim_grid_descriptions([{field: p[field] for field in grid_fields} for p in products])
+    orjson_body = server.dump_json(orders)
+
+    encoders = {
+        "orders jsonable_encoder + json.dumps": lambda: json.dumps(jsonable_encoder(orders)).encode(),
+        "orders orjson.dumps": lambda: server.dump_json(orders),
+        f"orders gzip level {server.GZIP_LEVEL}": lambda: server.encode_body(orjson_body, "gzip"),
+    }
+    if server.brotli:
+        encoders[f"orders brotli quality {server.BROTLI_QUALITY}"] = lambda: server.encode_body(orjson_body, "br")
+    encoders["products full orjson.dumps"] = lambda: server.dump_json(products)
+    encoders["products grid orjson.dumps"] = lambda: server.dump_json(grid)
+
+    print(f"{args.serialization_orders} synthetic orders, {len(products)} products, "
+          f"mean of {args.serialization_runs} runs:")
+    result = {}
+    for name, encode in encoders.items():
+        result[name] = time_encoder(encode, args.serialization_runs)
+        print(f"  {name:<40}{result[name]['mean_ms']:>10} ms{result[name]['bytes']:>12,} B")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"serialization": result}, f, indent=2)
+    return 0
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    print(f"\n{'scenario':<18}{'rps':>10}{'Δrps':>9}{'p95 ms':>10}{'Δp95':>9}")
+    for name, current in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"{name:<18}{current['rps']:>10}{'new':>9}{current['p95_ms']:>10}{'new':>9}")
+            continue
+        rps_delta = (current["rps"] - base["rps"]) / base["rps"] if base["rps"] else 0.0
+        p95_delta = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        print(f"{name:<18}{current['rps']:>10}{rps_delta:>+9.1%}{current['p95_ms']:>10}{p95_delta:>+9.1%}")
+        if rps_delta < -threshold:
+            regressions.append(f"{name}: throughput {base['rps']} -> {current['rps']} rps ({rps_delta:+.1%})")
+        if p95_delta > threshold:
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {current['p95_ms']} ms ({p95_delta:+.1%})")
+    return regressions
+
+
+async def main(args) -> int:
+    os.environ["DB_NAME"] = args.db_name
+    # every simulated shopper shares one client address; measure the handlers, not the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    import server
+
+    await seed(server, args)
+    # a previous run may have died before cleaning up after itself
+    await reset_mutations(server)
+    fx = await load_fixtures(server)
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url.rstrip("/")
+    else:
+        await server.app.router.startup()
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://benchmark"
+
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results: Dict[str, Any] = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as http:
+            for name in selected:
+                if name == "excel_import":
+                    results[name] = await run_excel_import(http, fx, args)
+                else:
+                    factory = SCENARIOS[name]
+                    await drive(http, factory, fx, args.concurrency, args.warmup, args.seed, record=False)
+                    results[name] = await drive(http, factory, fx, args.concurrency, args.duration, args.seed, record=True)
+                r = results[name]
+                print(f"{name:<18} {r['requests']:>7} req  {r['rps']:>9} rps  p50 {r['p50_ms']:>8} ms  "
+                      f"p95 {r['p95_ms']:>8} ms  p99 {r['p99_ms']:>8} ms  errors {r['errors']}")
+                if name in MUTATING_SCENARIOS:
+                    await reset_mutations(server)
+    finally:
+        await reset_mutations(server)
+        if not args.base_url:
+            await server.app.router.shutdown()
+
+    run = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "mode": args.base_url or "in-process",
+            "products": args.products,
+            "orders": args.orders,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "python": platform.python_version(),
+            "host": platform.node(),
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.cold_start:
+        sys.exit(run_cold_start(arguments))
+    if arguments.serialization:
+        sys.exit(run_serialization(arguments))
+    sys.exit(asyncio.run(main(arguments)))
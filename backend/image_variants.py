@@ -0,0 +1,30 @@
+import os
+from typing import Dict
+
+# runs in the image worker processes; kept free of server imports so a worker never
+# loads the app, its Mongo client or its threads
+
+# variant name -> max width; each is written as WebP and JPEG next to the original
+IMAGE_VARIANTS = {"thumb": 200, "card": 480, "detail": 1200}
+
+
+def generate_image_variants(source: str, digest: str, uploads_dir: str) -> Dict[str, Dict[str, str]]:
+    from PIL import Image, ImageOps
+
+    variants: Dict[str, Dict[str, str]] = {}
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ("RGBA", "LA") or "transparency" in original.info
+        for name, width in IMAGE_VARIANTS.items():
+            webp_name = f"{digest}-{name}.webp"
+            jpeg_name = f"{digest}-{name}.jpg"
+            webp_path = os.path.join(uploads_dir, webp_name)
+            jpeg_path = os.path.join(uploads_dir, jpeg_name)
+            if not (os.path.exists(webp_path) and os.path.exists(jpeg_path)):
+                image = original.copy()
+                image.thumbnail((width, width * 4), Image.LANCZOS)
+                image.convert("RGBA" if has_alpha else "RGB").save(webp_path, "WEBP", quality=80, method=4)
+                flat = image.convert("RGB")
+                flat.save(jpeg_path, "JPEG", quality=82, optimize=True, progressive=True)
+            variants[name] = {"webp": f"/uploads/{webp_name}", "jpeg": f"/uploads/{jpeg_name}"}
+    return variants
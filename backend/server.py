@@ -1,12 +1,46 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Request, Form
+import time
+# taken before the framework imports so the startup report covers them
+SERVER_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Request, Form, Query
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import NotModifiedResponse
+from email.utils import formatdate
+import anyio
+import mimetypes
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, ASCENDING, DESCENDING, ReturnDocument, UpdateOne, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import re
+import asyncio
+import contextvars
+import threading
+import socket
+import ipaddress
+import multiprocessing
+import tempfile
+import json
+import csv
+import io
+import gzip
+import zlib
+import orjson
+import base64
+import binascii
+import bisect
+import math
+import hashlib
 import logging
-import shutil
+import importlib
+import resource
+import sys
+import unicodedata
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any
@@ -14,11 +48,14 @@ import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
-import pandas as pd
-from io import BytesIO
-from emergentintegrations.payments.stripe.checkout import (
-    StripeCheckout, CheckoutSessionResponse, CheckoutSessionRequest
-)
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from image_variants import generate_image_variants
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,10 +63,213 @@ load_dotenv(ROOT_DIR / '.env')
 # Create uploads directory
 UPLOADS_DIR = ROOT_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
+# partial uploads land here; same filesystem as UPLOADS_DIR so os.replace stays atomic,
+# and the /uploads mount refuses dot-prefixed paths so it is never served
+UPLOADS_INCOMING_DIR = UPLOADS_DIR / ".incoming"
+UPLOADS_INCOMING_DIR.mkdir(exist_ok=True)
+
+# ===================== LAZY DEPENDENCIES =====================
+
+# pandas and the payment SDK are only needed by the Excel import and payment routes,
+# so workers import them on first use instead of paying for them on every cold start
+LAZY_MODULES = {
+    "pandas": "pandas",
+    "stripe": "emergentintegrations.payments.stripe.checkout",
+}
+WARM_IMPORTS = [name.strip() for name in os.environ.get('WARM_IMPORTS', '').split(',') if name.strip()]
+
+lazy_import_lock = threading.Lock()
+lazy_import_seconds: Dict[str, float] = {}
+
+def load_dependency(name: str):
+    module_name = LAZY_MODULES[name]
+    module = sys.modules.get(module_name)
+    if module is not None and name in lazy_import_seconds:
+        return module
+    with lazy_import_lock:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        lazy_import_seconds.setdefault(name, round(time.perf_counter() - started, 4))
+    return module
+
+def warm_dependencies(names: List[str]):
+    for name in names:
+        try:
+            load_dependency(name)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Warm-up import of {name} failed: {e}")
+
+# ===================== METRICS =====================
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# driver handshakes and heartbeats are not application queries
+IGNORED_MONGO_COMMANDS = {"hello", "ismaster", "isMaster", "endSessions", "saslStart", "saslContinue"}
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestQueries:
+    def __init__(self):
+        # (collection, command) -> [round trips, seconds]
+        self.commands: Dict[tuple, list] = {}
+        # set by the rate limiter on shed-able routes; only these feed the overload signal
+        self.load_signal = False
+
+    @property
+    def round_trips(self) -> int:
+        return sum(count for count, _ in self.commands.values())
+
+    def breakdown(self) -> List[str]:
+        ranked = sorted(self.commands.items(), key=lambda item: -item[1][1])
+        return [f"{coll}.{cmd} x{count} {seconds * 1000:.1f}ms" for (coll, cmd), (count, seconds) in ranked]
+
+current_request_queries: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar(
+    "current_request_queries", default=None
+)
+
+class MetricsRegistry:
+    def __init__(self):
+        # driver events fire on Motor's executor threads
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[tuple, int] = {}
+        self.request_latency: Dict[tuple, Histogram] = {}
+        self.request_round_trips: Dict[str, Histogram] = {}
+        self.mongo_latency: Dict[tuple, Histogram] = {}
+        self.mongo_failures: Dict[tuple, int] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, queries: RequestQueries):
+        with self.lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.request_latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.request_round_trips.setdefault(route, Histogram(ROUND_TRIP_BUCKETS)).observe(queries.round_trips)
+
+    def observe_command(self, collection: str, command: str, seconds: float, failed: bool):
+        with self.lock:
+            key = (collection, command)
+            self.mongo_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if failed:
+                self.mongo_failures[key] = self.mongo_failures.get(key, 0) + 1
+            queries = current_request_queries.get()
+            if queries is not None:
+                entry = queries.commands.setdefault(key, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+metrics = MetricsRegistry()
+
+MONGO_LATENCY_SAMPLES = 512
+MONGO_LATENCY_MIN_SAMPLES = 5
+
+class MongoLoad:
+    def __init__(self):
+        # fed from Motor's executor threads, read by the rate limiter
+        self.lock = threading.Lock()
+        self.checked_out: Dict[Any, int] = {}
+        self.waiting = 0
+        # (monotonic time, seconds) of commands issued by shed-able routes
+        self.latencies = deque(maxlen=MONGO_LATENCY_SAMPLES)
+
+    def observe_latency(self, seconds: float):
+        with self.lock:
+            self.latencies.append((time.monotonic(), seconds))
+
+    def recent_latency(self, max_age: float) -> float:
+        # p90 over the window; samples age out, so shedding lifts on its own
+        cutoff = time.monotonic() - max_age
+        with self.lock:
+            recent = sorted(seconds for at, seconds in self.latencies if at >= cutoff)
+        if len(recent) < MONGO_LATENCY_MIN_SAMPLES:
+            return 0.0
+        return recent[min(len(recent) - 1, int(len(recent) * 0.9))]
+
+    def busiest_pool(self) -> int:
+        with self.lock:
+            return max(self.checked_out.values(), default=0)
+
+    def adjust(self, address, checked_out: int = 0, waiting: int = 0):
+        with self.lock:
+            self.checked_out[address] = self.checked_out.get(address, 0) + checked_out
+            self.waiting += waiting
+
+mongo_load = MongoLoad()
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    def connection_check_out_started(self, event):
+        mongo_load.adjust(event.address, waiting=1)
+
+    def connection_checked_out(self, event):
+        mongo_load.adjust(event.address, checked_out=1, waiting=-1)
+
+    def connection_check_out_failed(self, event):
+        mongo_load.adjust(event.address, waiting=-1)
+
+    def connection_checked_in(self, event):
+        mongo_load.adjust(event.address, checked_out=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self.pending: Dict[tuple, str] = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_MONGO_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else event.command.get("collection", event.database_name)
+        self.pending[(event.connection_id, event.request_id)] = collection
+
+    def finish(self, event, failed: bool):
+        collection = self.pending.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            seconds = event.duration_micros / 1_000_000
+            metrics.observe_command(collection, event.command_name, seconds, failed)
+            # only storefront-path commands count; admin aggregations and exports are slow
+            # by design, and change stream getMores block on purpose
+            queries = current_request_queries.get()
+            if queries is not None and queries.load_signal and event.command_name != "getMore":
+                mongo_load.observe_latency(seconds)
+
+    def succeeded(self, event):
+        self.finish(event, False)
+
+    def failed(self, event):
+        self.finish(event, True)
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener(), MongoPoolListener()])
 db = client[os.environ['DB_NAME']]
 
 # JWT Config
@@ -39,13 +279,12 @@ JWT_ALGORITHM = "HS256"
 # Stripe Config
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
 
-app = FastAPI()
+CORS_ORIGINS = [origin.strip().rstrip('/') for origin in os.environ.get('CORS_ORIGINS', '*').split(',')]
+
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
-# Mount uploads directory for serving static files
-app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
-
 # ===================== MODELS =====================
 
 class ProductCreate(BaseModel):
@@ -103,9 +342,14 @@ class Order(BaseModel):
     status: str = "pending"
     payment_status: str = "unpaid"
     payment_session_id: str = ""
+    stock_reserved: bool = False
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class BulkOrderStatusUpdate(BaseModel):
+    order_ids: List[str]
+    status: str
+
 class ContactMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -135,6 +379,11 @@ class ProductSortUpdate(BaseModel):
     product_id: str
     sort_order: int
 
+class ProductMove(BaseModel):
+    product_id: str
+    after_id: Optional[str] = None
+    before_id: Optional[str] = None
+
 class SiteSettings(BaseModel):
     phone: str = "+998 (98) 177 36 33"
     email: str = "reklamasavdo4@gmail.com"
@@ -153,28 +402,249 @@ class AboutContent(BaseModel):
     vision: str = "To be the most trusted partner for businesses seeking quality signage."
     values: List[Dict[str, str]] = []
 
+# ===================== CACHE HELPERS =====================
+
+class TTLCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def drop(self, key: str):
+        self.entries.pop(key, None)
+
+    def drop_where(self, predicate):
+        for key in [k for k, (_, value) in self.entries.items() if predicate(value)]:
+            del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self.calls[key] = future
+            future.add_done_callback(lambda _: self.calls.pop(key, None))
+        # shield so one poller disconnecting does not cancel the shared lookup
+        return await asyncio.shield(future)
+
+# ===================== RESPONSE ENCODING =====================
+
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+compression_stats: Dict[str, int] = {"compressed": 0, "br": 0, "gzip": 0, "bytes_in": 0, "bytes_out": 0}
+
+def dump_json(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=str)
+
+def json_response(payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    # skips FastAPI's jsonable_encoder pass, which dominates on large Mongo result lists
+    return Response(content=dump_json(payload), media_type="application/json", headers=headers)
+
+def negotiate_encoding(accept_encoding: str, available: Optional[tuple] = None) -> Optional[str]:
+    # picks the first of `available` (default: what this process can encode) with a non-zero q-value
+    if available is None:
+        available = (("br",) if brotli else ()) + ("gzip",)
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[token.strip()] = weight
+    for encoding in available:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        encoded = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        encoded = gzip.compress(body, GZIP_LEVEL, mtime=0)
+    record_compression(encoding, len(body), len(encoded))
+    return encoded
+
+def record_compression(encoding: str, bytes_in: int, bytes_out: int):
+    compression_stats["compressed"] += 1
+    compression_stats[encoding] += 1
+    compression_stats["bytes_in"] += bytes_in
+    compression_stats["bytes_out"] += bytes_out
+
+class StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        self.bytes_in += len(data)
+        out = self.compressor.process(data) if self.encoding == "br" else self.compressor.compress(data)
+        self.bytes_out += len(out)
+        return out
+
+    def finish(self) -> bytes:
+        out = self.compressor.finish() if self.encoding == "br" else self.compressor.flush()
+        self.bytes_out += len(out)
+        record_compression(self.encoding, self.bytes_in, self.bytes_out)
+        return out
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body:
+                    # whole body in one message: compress only when it pays off
+                    if len(body) >= self.minimum_size:
+                        body = encode_body(body, encoding)
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(body))
+                        headers.add_vary_header("Accept-Encoding")
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                del headers["Content-Length"]
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                compressor = StreamCompressor(encoding)
+                await send(start_message)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
 # ===================== AUTH HELPERS =====================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+ADMIN_CACHE_TTL = float(os.environ.get('ADMIN_CACHE_TTL', '60'))
+ADMIN_CACHE_SIZE = 1024
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+admin_token_cache = TTLCache(ADMIN_CACHE_SIZE)
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
-def verify_password(password: str, hashed: str) -> bool:
+def verify_password_sync(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, verify_password_sync, password, hashed)
+
 def create_token(email: str) -> str:
     payload = {
         "email": email,
+        "jti": uuid.uuid4().hex,
         "exp": datetime.now(timezone.utc) + timedelta(days=7)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def revoke_token(token: str, payload: Dict[str, Any]):
+    # the revocation is stored before any worker is told to drop its copy, so none can re-cache the token
+    if payload.get("jti"):
+        await db.revoked_tokens.update_one(
+            {"jti": payload["jti"]},
+            {"$set": {"jti": payload["jti"], "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc)}},
+            upsert=True
+        )
+    admin_token_cache.drop(token_cache_key(token))
+    invalidation_bus.publish("admins")
+
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    key = token_cache_key(credentials.credentials)
+    cached = admin_token_cache.get(key)
+    if cached is not None:
+        return cached[0]
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         email = payload.get("email")
-        admin = await db.admins.find_one({"email": email}, {"_id": 0})
+        if payload.get("jti") and await db.revoked_tokens.find_one({"jti": payload["jti"]}, {"_id": 1}):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        admin = await db.admins.find_one({"email": email}, {"_id": 0, "password": 0})
         if not admin:
             raise HTTPException(status_code=401, detail="Invalid token")
+        ttl = min(ADMIN_CACHE_TTL, payload["exp"] - time.time())
+        admin_token_cache.put(key, (admin, payload), ttl)
         return admin
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -201,7 +671,7 @@ async def register_admin(admin: AdminCreate):
     admin_doc = {
         "id": str(uuid.uuid4()),
         "email": admin.email,
-        "password": hash_password(admin.password),
+        "password": await hash_password(admin.password),
         "name": admin.name,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
@@ -212,7 +682,7 @@ async def register_admin(admin: AdminCreate):
 @api_router.post("/auth/login")
 async def login_admin(login: AdminLogin):
     admin = await db.admins.find_one({"email": login.email}, {"_id": 0})
-    if not admin or not verify_password(login.password, admin["password"]):
+    if not admin or not await verify_password(login.password, admin["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_token(login.email)
@@ -222,59 +692,1160 @@ async def login_admin(login: AdminLogin):
 async def get_me(admin = Depends(get_current_admin)):
     return {"email": admin["email"], "name": admin["name"]}
 
+@api_router.post("/auth/logout")
+async def logout_admin(credentials: HTTPAuthorizationCredentials = Depends(security), admin = Depends(get_current_admin)):
+    payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    await revoke_token(credentials.credentials, payload)
+    return {"message": "Logged out"}
+
 # ===================== IMAGE UPLOAD =====================
 
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp", "bmp", "tiff"}
+# vector logos are stored as uploaded; Pillow cannot rasterize them, so they get no variants
+SVG_CONTENT_TYPE = "image/svg+xml"
+
+image_executor: Optional[ProcessPoolExecutor] = None
+
+def get_image_executor() -> ProcessPoolExecutor:
+    # forking this process would copy Motor's and the executors' locks mid-use into the
+    # child; forkserver/spawn workers start clean and import only image_variants
+    global image_executor
+    if image_executor is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            context.set_forkserver_preload(["image_variants"])
+        image_executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=context)
+    return image_executor
+
+async def save_upload_stream(file: UploadFile) -> tuple:
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, dir=UPLOADS_INCOMING_DIR, prefix="upload-")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
+            digest.update(chunk)
+            await asyncio.to_thread(tmp.write, chunk)
+        await asyncio.to_thread(tmp.close)
+    except BaseException:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+    return tmp.name, digest.hexdigest(), size
+
 @api_router.post("/upload/image")
 async def upload_image(file: UploadFile = File(...), admin = Depends(get_current_admin)):
-    if not file.content_type.startswith('image/'):
+    if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
-    
-    ext = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-    filename = f"{uuid.uuid4()}.{ext}"
+
+    ext = file.filename.rsplit('.', 1)[-1].lower() if file.filename and '.' in file.filename else 'jpg'
+    is_svg = file.content_type == SVG_CONTENT_TYPE or ext == "svg"
+    if is_svg:
+        ext = "svg"
+    elif ext not in IMAGE_EXTENSIONS:
+        ext = 'jpg'
+    tmp_path, digest, size = await save_upload_stream(file)
+
+    # content-addressed: an identical upload resolves to the file already on disk
+    filename = f"{digest}.{ext}"
     file_path = UPLOADS_DIR / filename
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    return {"filename": filename, "url": f"/uploads/{filename}"}
+    deduplicated = file_path.exists()
+    if deduplicated:
+        os.unlink(tmp_path)
+    else:
+        os.replace(tmp_path, file_path)
+
+    if is_svg:
+        return {"filename": filename, "url": f"/uploads/{filename}", "size": size,
+                "deduplicated": deduplicated, "variants": {}}
+
+    try:
+        variants = await asyncio.get_running_loop().run_in_executor(
+            get_image_executor(), generate_image_variants, str(file_path), digest, str(UPLOADS_DIR)
+        )
+    except Exception as e:
+        if not deduplicated:
+            file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+
+    return {
+        "filename": filename,
+        "url": f"/uploads/{filename}",
+        "size": size,
+        "deduplicated": deduplicated,
+        "variants": variants
+    }
+
+# ===================== UPLOADS SERVING =====================
+
+UPLOADS_SENDFILE = os.environ.get('UPLOADS_SENDFILE', 'true').lower() == 'true'
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+# <sha256>.<ext> originals and <sha256>-<variant>.<ext> resizes never change once written
+CONTENT_ADDRESSED_RE = re.compile(r"^([0-9a-f]{64}(?:-[a-z]+)?)\.[a-z0-9]+$")
+PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+# uploaded SVGs are served from our origin, so scripts in them must never run
+SVG_CONTENT_SECURITY_POLICY = "default-src 'none'; style-src 'unsafe-inline'; img-src data:; sandbox"
+BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+uploads_stats: Dict[str, int] = {
+    "requests": 0, "full": 0, "partial": 0, "not_modified": 0,
+    "range_not_satisfiable": 0, "immutable": 0, "precompressed": 0, "bytes_sent": 0,
+}
+
+def parse_byte_range(header: str, size: int) -> Optional[tuple]:
+    # returns (start, end) inclusive, () when unsatisfiable, None to ignore the header
+    match = BYTE_RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            return ()
+        return (max(size - suffix, 0), size - 1)
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return ()
+    return (start, end)
+
+class UploadFileResponse(Response):
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, headers: Dict[str, str], status_code: int = 200, offset: int = 0, length: int = 0):
+        headers = {**headers, "content-length": str(length)}
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if UPLOADS_SENDFILE and "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.offset,
+                    "count": self.length,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, "rb") as f:
+                await f.seek(self.offset)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await f.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        uploads_stats["bytes_sent"] += self.length
+
+class UploadsStaticFiles(StaticFiles):
+    def lookup_path(self, path: str) -> tuple:
+        # .incoming holds partial uploads; nothing dot-prefixed is public
+        if any(part.startswith(".") for part in Path(path).parts):
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        uploads_stats["requests"] += 1
+        full_path = str(full_path)
+        name = os.path.basename(full_path)
+        match = CONTENT_ADDRESSED_RE.match(name)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        serve_path, stat, encoding, vary = full_path, stat_result, None, False
+        range_header = request_headers.get("range")
+        if status_code == 200 and not range_header:
+            variants = {candidate: full_path + suffix for candidate, suffix in PRECOMPRESSED_SUFFIXES
+                        if os.path.isfile(full_path + suffix)}
+            if variants:
+                vary = True
+                encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), tuple(variants))
+                if encoding:
+                    serve_path = variants[encoding]
+                    stat = os.stat(serve_path)
+
+        if match:
+            etag = f'"{match.group(1)}{"-" + encoding if encoding else ""}"'
+        else:
+            etag = '"' + hashlib.md5(f"{stat.st_mtime}-{stat.st_size}-{encoding}".encode()).hexdigest() + '"'
+        headers = {
+            "content-type": media_type,
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": IMMUTABLE_CACHE_CONTROL if match else MUTABLE_CACHE_CONTROL,
+            "accept-ranges": "bytes",
+        }
+        if media_type == SVG_CONTENT_TYPE:
+            headers["content-security-policy"] = SVG_CONTENT_SECURITY_POLICY
+        if vary:
+            # the identity response differs by Accept-Encoding too whenever a compressed variant exists
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+            uploads_stats["precompressed"] += 1
+        if match:
+            uploads_stats["immutable"] += 1
+
+        if self.is_not_modified(Headers(headers=headers), request_headers):
+            uploads_stats["not_modified"] += 1
+            return NotModifiedResponse(Headers(headers=headers))
+
+        size = stat.st_size
+        if range_header and status_code == 200 and request_headers.get("if-range", etag) == etag:
+            byte_range = parse_byte_range(range_header, size)
+            if byte_range == ():
+                uploads_stats["range_not_satisfiable"] += 1
+                return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                uploads_stats["partial"] += 1
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+                return UploadFileResponse(serve_path, headers, 206, start, end - start + 1)
+
+        uploads_stats["full"] += 1
+        return UploadFileResponse(serve_path, headers, status_code, 0, size)
+
+app.mount("/uploads", UploadsStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+
+@api_router.get("/admin/uploads/stats")
+async def get_uploads_stats(admin = Depends(get_current_admin)):
+    return uploads_stats
+
+# ===================== PRODUCT SEARCH =====================
+
+# Uzbek Cyrillic letters and Russian ё folded onto their closest base letters
+CHAR_FOLDS = str.maketrans({
+    "ё": "е", "ў": "у", "қ": "к", "ғ": "г", "ҳ": "х", "ъ": "", "ь": "",
+    "ʻ": "", "ʼ": "", "‘": "", "’": "", "`": "", "'": "",
+})
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SEARCH_FIELD_WEIGHTS = {"sku": 4.0, "name": 3.0, "category": 2.0, "description": 1.0}
+EXACT_SCORE, PREFIX_SCORE, FUZZY_SCORE = 1.0, 0.7, 0.4
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(CHAR_FOLDS)
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize_text(text))
+
+def single_deletes(token: str) -> set:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def within_one_edit(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        # adjacent transposition
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    return any(longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
+
+class ProductSearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_tokens: Dict[str, set] = {}
+        self.doc_category: Dict[str, str] = {}
+        self.sorted_tokens: List[str] = []
+        self.deletes: Dict[str, set] = {}
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, product: Dict[str, Any]):
+        product_id = product["id"]
+        self.remove(product_id)
+        weights: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field, "")):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                self.dirty = True
+                for deleted in single_deletes(token):
+                    self.deletes.setdefault(deleted, set()).add(token)
+            self.postings[token][product_id] = weight
+        self.doc_tokens[product_id] = set(weights)
+        self.doc_category[product_id] = product.get("category", "")
+
+    def remove(self, product_id: str):
+        for token in self.doc_tokens.pop(product_id, set()):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(product_id, None)
+            if not docs:
+                del self.postings[token]
+                self.dirty = True
+                for deleted in single_deletes(token):
+                    variants = self.deletes.get(deleted)
+                    if variants:
+                        variants.discard(token)
+                        if not variants:
+                            del self.deletes[deleted]
+        self.doc_category.pop(product_id, None)
+
+    def clear(self):
+        self.__init__()
+
+    def prefix_matches(self, prefix: str) -> List[str]:
+        if self.dirty:
+            self.sorted_tokens = sorted(self.postings)
+            self.dirty = False
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        matches = []
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def fuzzy_matches(self, term: str) -> set:
+        candidates = set(self.deletes.get(term, set()))
+        if term in self.postings:
+            candidates.add(term)
+        for deleted in single_deletes(term):
+            if deleted in self.postings:
+                candidates.add(deleted)
+            candidates |= self.deletes.get(deleted, set())
+        return {token for token in candidates if within_one_edit(term, token)}
+
+    def term_scores(self, term: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+
+        def collect(tokens, factor):
+            for token in tokens:
+                for product_id, weight in self.postings.get(token, {}).items():
+                    scores[product_id] = max(scores.get(product_id, 0.0), weight * factor)
+
+        collect([term], EXACT_SCORE)
+        if len(term) >= 2:
+            collect(self.prefix_matches(term), PREFIX_SCORE)
+        if len(term) >= 4:
+            collect(self.fuzzy_matches(term), FUZZY_SCORE)
+        return scores
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 1000) -> List[tuple]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        totals: Optional[Dict[str, float]] = None
+        for term in terms:
+            scores = self.term_scores(term)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {pid: totals[pid] + score for pid, score in scores.items() if pid in totals}
+            if not totals:
+                return []
+        results = [
+            (product_id, score) for product_id, score in totals.items()
+            if not category or self.doc_category.get(product_id) == category
+        ]
+        results.sort(key=lambda r: -r[1])
+        return results[:limit]
+
+search_index = ProductSearchIndex()
+
+async def rebuild_search_index():
+    global search_index
+    # built off to the side so searches keep hitting the old index until the swap
+    fresh = ProductSearchIndex()
+    projection = {"_id": 0, "id": 1, "name": 1, "description": 1, "sku": 1, "category": 1}
+    async for product in db.products.find({}, projection):
+        fresh.add(product)
+    search_index = fresh
+    return len(fresh)
+
+# ===================== PAGINATION =====================
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+STREAM_BATCH_SIZE = 500
+# stock_holds is transient reservation bookkeeping and never leaves the server
+PRODUCT_PROJECTION = {"_id": 0, "stock_holds": 0}
+# named field subsets list endpoints serve via ?view=; "full" is the default
+PRODUCT_VIEWS = {
+    "full": PRODUCT_PROJECTION,
+    "grid": {"_id": 0, "id": 1, "name": 1, "description": 1, "price": 1, "category": 1,
+             "quantity": 1, "sku": 1, "image_url": 1, "sort_order": 1},
+}
+ORDER_VIEWS = {
+    "full": {"_id": 0},
+    "summary": {"_id": 0, "items": 0, "customer_address": 0, "payment_session_id": 0},
+}
+CONTACT_VIEWS = {
+    "full": {"_id": 0},
+    "summary": {"_id": 0, "message": 0},
+}
+# grid cards clamp the description to two lines, so the rest is dead weight
+GRID_DESCRIPTION_CHARS = 160
+
+def view_projection(views: Dict[str, Dict[str, int]], view: str) -> Dict[str, int]:
+    projection = views.get(view)
+    if projection is None:
+        raise HTTPException(status_code=400, detail=f"Unknown view '{view}', expected one of: {', '.join(views)}")
+    return projection
+
+def trim_grid_descriptions(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for product in products:
+        description = product.get("description") or ""
+        if len(description) > GRID_DESCRIPTION_CHARS:
+            product["description"] = description[:GRID_DESCRIPTION_CHARS].rstrip() + "…"
+    return products
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_query(query: Dict[str, Any], sort_field: str, direction: int, cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return query
+    last_value, last_id = decode_cursor(cursor)
+    op = "$gt" if direction == ASCENDING else "$lt"
+    after = {"$or": [
+        {sort_field: {op: last_value}},
+        {sort_field: last_value, "id": {op: last_id}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+async def paginate(collection, query: Dict[str, Any], sort_field: str, direction: int,
+                   limit: Optional[int], cursor: Optional[str],
+                   projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    docs = await collection.find(keyset_query(query, sort_field, direction, cursor), projection or {"_id": 0}) \
+        .sort([(sort_field, direction), ("id", direction)]) \
+        .limit(page_size + 1) \
+        .to_list(page_size + 1)
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        last = docs[-1]
+        next_cursor = encode_cursor([last.get(sort_field), last.get("id")])
+    return {"items": docs, "next_cursor": next_cursor, "limit": page_size}
+
+LEGACY_LIST_LIMIT = 1000
+
+async def legacy_list(collection, query: Dict[str, Any], projection: Dict[str, int]) -> Response:
+    # unparameterised callers predate pagination; flag a cut-off list instead of hiding it
+    docs = await collection.find(query, projection).sort("created_at", DESCENDING).to_list(LEGACY_LIST_LIMIT + 1)
+    headers = None
+    if len(docs) > LEGACY_LIST_LIMIT:
+        docs = docs[:LEGACY_LIST_LIMIT]
+        headers = {"X-Truncated": "true"}
+    return json_response(docs, headers)
+
+async def paginate_ranked(ranked: List[tuple], limit: Optional[int], cursor: Optional[str],
+                          projection: Dict[str, int]) -> Dict[str, Any]:
+    # keyset over (score desc, id) of the in-memory ranking; only the page itself is read from Mongo
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    ranked = sorted(ranked, key=lambda r: (-r[1], r[0]))
+    if cursor:
+        last_score, last_id = decode_cursor(cursor)
+        if not isinstance(last_score, (int, float)) or not isinstance(last_id, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        ranked = [r for r in ranked if (-r[1], r[0]) > (-last_score, last_id)]
+    page = ranked[:page_size]
+    products = await db.products.find({"id": {"$in": [pid for pid, _ in page]}}, projection).to_list(len(page))
+    by_id = {p["id"]: p for p in products}
+    next_cursor = encode_cursor([page[-1][1], page[-1][0]]) if len(ranked) > page_size else None
+    return {"items": [by_id[pid] for pid, _ in page if pid in by_id], "next_cursor": next_cursor, "limit": page_size}
+
+def stream_ndjson(collection, query: Dict[str, Any], sort_field: str, direction: int,
+                  projection: Optional[Dict[str, int]] = None) -> StreamingResponse:
+    async def generate():
+        cursor = collection.find(query, projection or {"_id": 0}) \
+            .sort([(sort_field, direction), ("id", direction)]) \
+            .batch_size(STREAM_BATCH_SIZE)
+        async for doc in cursor:
+            yield dump_json(doc) + b"\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# ===================== CATALOG CACHE =====================
+
+CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '256'))
+CATALOG_CACHE_CONTROL = "public, no-cache"
+
+class CatalogCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.version = 0
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def bump(self):
+        self.version += 1
+        self.entries.clear()
+
+    def get(self, key: str) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, payload: Any, version: int) -> tuple:
+        body = dump_json(payload)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        # last slot memoizes compressed bodies per content-coding
+        entry = (body, etag, {})
+        # a write landed while we were loading; serve the result but do not keep it
+        if version != self.version:
+            return entry
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+        }
+
+catalog_cache = CatalogCache(CATALOG_CACHE_MAX_ENTRIES)
+
+def product_catalog_changed():
+    catalog_cache.bump()
+    invalidation_bus.publish("catalog")
+
+def product_search_changed():
+    invalidation_bus.publish("search")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def cached_catalog_response(request: Request, key: str, loader) -> Response:
+    entry = catalog_cache.get(key)
+    if entry is None:
+        version = catalog_cache.version
+        entry = catalog_cache.put(key, await loader(), version)
+    body, etag, encoded = entry
+    encoding = None
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding:
+        etag = f'{etag[:-1]}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        catalog_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        if encoding not in encoded:
+            encoded[encoding] = encode_body(body, encoding)
+        body = encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/admin/cache")
+async def get_cache_stats(admin = Depends(get_current_admin)):
+    return {"catalog": catalog_cache.stats(), "compression": compression_stats, "invalidation": invalidation_bus.stats()}
+
+# ===================== INVALIDATION BUS =====================
+
+# auto: change streams when the deployment supports them (replica set), else version polling
+CACHE_INVALIDATION = os.environ.get('CACHE_INVALIDATION', 'auto').lower()
+CACHE_POLL_INTERVAL = float(os.environ.get('CACHE_POLL_INTERVAL', '1.0'))
+SEARCH_REFRESH_DELAY = 0.25
+SEARCH_REFRESH_MAX_IDS = 1000
+WATCHED_COLLECTIONS = ["products", "site_settings", "admins", "revoked_tokens"]
+SEARCHABLE_FIELDS = {"name", "description", "sku", "category"}
+
+class InvalidationBus:
+    def __init__(self):
+        self.mode = "off"
+        self.task: Optional[asyncio.Task] = None
+        self.versions: Dict[str, int] = {}
+        self.pending: set = set()
+        self.flushing = False
+        self.search_refresh_ids: set = set()
+        self.search_task: Optional[asyncio.Task] = None
+        self.applied: Dict[str, int] = {}
+        self.last_applied_at: Optional[str] = None
+        self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "applied": self.applied,
+            "last_applied_at": self.last_applied_at,
+            "versions": self.versions,
+            "errors": self.errors,
+        }
+
+    # ---- local side: called after this worker has already updated its own caches
+
+    def publish(self, topic: str):
+        # change streams see the write itself; only polling needs an explicit signal
+        if self.mode != "poll":
+            return
+        self.pending.add(topic)
+        if not self.flushing:
+            self.flushing = True
+            spawn_background(self.flush())
+
+    async def flush(self):
+        try:
+            while self.pending:
+                topic = self.pending.pop()
+                doc = await db.cache_versions.find_one_and_update(
+                    {"_id": topic},
+                    {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                # skip our own bump unless another worker's landed in between
+                if self.versions.get(topic, 0) == doc["version"] - 1:
+                    self.versions[topic] = doc["version"]
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache invalidation publish failed: {e}")
+        finally:
+            self.flushing = False
+
+    # ---- remote side: another worker (or a direct DB edit) changed something
+
+    def apply(self, topic: str, jti: Optional[str] = None):
+        self.applied[topic] = self.applied.get(topic, 0) + 1
+        self.last_applied_at = datetime.now(timezone.utc).isoformat()
+        # settings are part of the storefront bootstrap payload held in the catalog cache
+        if topic in ("catalog", "search", "settings"):
+            catalog_cache.bump()
+        if topic == "search":
+            self.refresh_search(None)
+        elif topic == "settings":
+            settings_cache.clear()
+        elif topic == "admins":
+            if jti:
+                admin_token_cache.drop_where(lambda entry: entry[1].get("jti") == jti)
+            else:
+                admin_token_cache.clear()
+
+    def flush_all(self):
+        for topic in ("search", "settings", "admins"):
+            self.apply(topic)
+
+    def refresh_search(self, document_id: Any):
+        # None means "unknown which products", which forces a full rebuild
+        if document_id is None or len(self.search_refresh_ids) >= SEARCH_REFRESH_MAX_IDS:
+            self.search_refresh_ids = {None}
+        elif None not in self.search_refresh_ids:
+            self.search_refresh_ids.add(document_id)
+        if self.search_task is None or self.search_task.done():
+            self.search_task = spawn_background(self.run_search_refresh())
+
+    async def run_search_refresh(self):
+        await asyncio.sleep(SEARCH_REFRESH_DELAY)
+        ids, self.search_refresh_ids = self.search_refresh_ids, set()
+        try:
+            if None in ids:
+                await rebuild_search_index()
+                return
+            products = await db.products.find({"_id": {"$in": list(ids)}}, SEARCH_PROJECTION).to_list(None)
+            for product in products:
+                search_index.add(product)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Search index refresh failed: {e}")
+
+    async def handle_change(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            catalog_cache.bump()
+            self.flush_all()
+            return
+        if collection == "products":
+            if operation == "update":
+                description = change.get("updateDescription", {})
+                fields = {f.split(".")[0] for f in list(description.get("updatedFields", {})) + description.get("removedFields", [])}
+                if fields & SEARCHABLE_FIELDS:
+                    self.refresh_search(change["documentKey"]["_id"])
+            elif operation in ("insert", "replace"):
+                self.refresh_search(change["documentKey"]["_id"])
+            elif operation == "delete":
+                # the event only carries _id, not the product id the index is keyed by
+                self.refresh_search(None)
+            self.apply("catalog")
+        elif collection == "site_settings":
+            self.apply("settings")
+        elif collection == "admins":
+            self.apply("admins")
+        elif collection == "revoked_tokens" and operation != "delete":
+            # deletes are the TTL monitor dropping expired revocations
+            self.apply("admins", jti=(change.get("fullDocument") or {}).get("jti"))
+
+    async def watch_changes(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+        resume_token = None
+        while True:
+            try:
+                async with db.watch(pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        await self.handle_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # typically the resume point fell off the oplog: events were lost, so drop everything
+                self.errors += 1
+                logger.warning(f"Change stream restarted without resume: {e}")
+                resume_token = None
+                catalog_cache.bump()
+                self.flush_all()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Change stream error, resuming: {e}")
+            await asyncio.sleep(1)
+
+    async def poll_versions(self):
+        while True:
+            try:
+                async for doc in db.cache_versions.find({}):
+                    topic, version = doc["_id"], doc.get("version", 0)
+                    if version > self.versions.get(topic, 0):
+                        self.versions[topic] = version
+                        self.apply(topic)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Cache version poll failed: {e}")
+            await asyncio.sleep(CACHE_POLL_INTERVAL)
+
+    async def change_streams_supported(self) -> bool:
+        try:
+            async with db.watch([{"$match": {"ns.coll": "cache_versions"}}], max_await_time_ms=1) as stream:
+                await stream.try_next()
+            return True
+        except OperationFailure as e:
+            logger.info(f"Change streams unavailable ({e.code}), polling cache versions instead")
+            return False
+
+    async def start(self):
+        if CACHE_INVALIDATION == "off":
+            return
+        if CACHE_INVALIDATION != "poll" and await self.change_streams_supported():
+            self.mode = "changestream"
+            self.task = asyncio.create_task(self.watch_changes())
+            return
+        self.mode = "poll"
+        # start from the current versions; this worker's caches are empty anyway
+        async for doc in db.cache_versions.find({}):
+            self.versions[doc["_id"]] = doc.get("version", 0)
+        self.task = asyncio.create_task(self.poll_versions())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+invalidation_bus = InvalidationBus()
+
+# ===================== PRODUCT IMPORT =====================
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '1000'))
+IMPORT_UPLOAD_CHUNK = 1024 * 1024
+MAX_IMPORT_ERRORS = 1000
+# renewed on every progress write; a queued or running job past it lost its worker
+IMPORT_JOB_LEASE_SECONDS = 300
+IMPORT_TEXT_COLUMNS = ["name", "description", "category", "sku", "image_url"]
+# only new products get these; an update never overwrites a field the file leaves out or blank
+IMPORT_DEFAULTS = {"description": "", "category": "General", "image_url": "", "quantity": 0}
+SEARCH_PROJECTION = {"_id": 0, "id": 1, "name": 1, "description": 1, "sku": 1, "category": 1}
+
+background_tasks: set = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def read_import_chunks(path: str, filename: str):
+    pd = load_dependency("pandas")
+    if filename.endswith('.xlsx') or filename.endswith('.xls'):
+        engine = 'openpyxl' if filename.endswith('.xlsx') else 'xlrd'
+        df = pd.read_excel(path, engine=engine, dtype=str)
+        return iter([df.iloc[i:i + IMPORT_CHUNK_SIZE] for i in range(0, len(df), IMPORT_CHUNK_SIZE)])
+    return iter(pd.read_csv(path, dtype=str, chunksize=IMPORT_CHUNK_SIZE))
+
+def validate_import_chunk(df) -> tuple:
+    pd = load_dependency("pandas")
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    rows = pd.DataFrame(index=df.index)
+    for column in IMPORT_TEXT_COLUMNS:
+        values = df[column] if column in df else pd.Series("", index=df.index)
+        values = values.fillna("").astype(str).str.strip()
+        # blank cells become None so they are left alone on update
+        rows[column] = values.where(values != "", None)
+    price = pd.to_numeric(df["price"], errors="coerce") if "price" in df else pd.Series(float("nan"), index=df.index)
+    raw_quantity = df["quantity"] if "quantity" in df else pd.Series("", index=df.index)
+    raw_quantity = raw_quantity.fillna("").astype(str).str.strip()
+    quantity = pd.to_numeric(raw_quantity.where(raw_quantity != "", None), errors="coerce")
+    rows["price"] = price
+    rows["quantity"] = quantity
+
+    checks = [
+        (rows["name"].isna(), "name is required"),
+        (price.isna(), "price must be a number"),
+        (price < 0, "price must not be negative"),
+        (quantity.isna() & (raw_quantity != ""), "quantity must be a number"),
+        (quantity < 0, "quantity must not be negative"),
+        (quantity.notna() & (quantity % 1 != 0), "quantity must be a whole number"),
+    ]
+    errors: Dict[Any, List[str]] = {}
+    invalid = pd.Series(False, index=df.index)
+    for mask, message in checks:
+        mask = mask.fillna(False)
+        invalid |= mask
+        for index in df.index[mask]:
+            errors.setdefault(index, []).append(message)
+
+    valid = rows[~invalid].copy()
+    # a price list that repeats a sku keeps its last row
+    with_sku = valid[valid["sku"].notna()]
+    repeated = with_sku.index[with_sku.duplicated("sku", keep="last")]
+    for index in repeated:
+        errors.setdefault(index, []).append("duplicate sku in file, later row kept")
+    valid = valid.drop(index=repeated)
+    report = [{"row": int(index) + 2, "errors": messages} for index, messages in sorted(errors.items())]
+    return valid, report
+
+def import_operations(valid, first_sort_order: int) -> tuple:
+    now = datetime.now(timezone.utc).isoformat()
+    operations, skus, inserted_ids = [], [], []
+    for position, record in enumerate(valid.to_dict("records")):
+        # new products go to the end of the catalog in file order; updates keep their place
+        sort_order = first_sort_order + position * SORT_GAP
+        fields = {key: value for key, value in record.items()
+                  if value is not None and not (isinstance(value, float) and math.isnan(value))}
+        fields["price"] = float(fields["price"])
+        if "quantity" in fields:
+            fields["quantity"] = int(fields["quantity"])
+        fields["updated_at"] = now
+        if fields.get("sku"):
+            skus.append(fields["sku"])
+            defaults = {key: value for key, value in IMPORT_DEFAULTS.items() if key not in fields}
+            operations.append(UpdateOne(
+                {"sku": fields["sku"]},
+                {"$set": fields,
+                 "$setOnInsert": {"id": str(uuid.uuid4()), "sort_order": sort_order, "created_at": now, **defaults}},
+                upsert=True
+            ))
+        else:
+            doc = Product(**{**IMPORT_DEFAULTS, **fields, "sort_order": sort_order}).model_dump()
+            inserted_ids.append(doc["id"])
+            operations.append(InsertOne(doc))
+    return operations, skus, inserted_ids
+
+def import_job_lease() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS)
+
+async def update_import_job(job_id: str, fields: Dict[str, Any], inc: Optional[Dict[str, int]] = None,
+                            errors: Optional[List[Dict[str, Any]]] = None):
+    update: Dict[str, Any] = {"$set": {**fields, "lease_until": import_job_lease()}}
+    if inc:
+        update["$inc"] = inc
+    if errors:
+        update["$push"] = {"errors": {"$each": errors, "$slice": MAX_IMPORT_ERRORS}}
+    await db.import_jobs.update_one({"id": job_id}, update)
+
+async def run_product_import(job_id: str, path: str, filename: str):
+    await update_import_job(job_id, {"status": "running", "started_at": datetime.now(timezone.utc).isoformat()})
+    totals = {"processed_rows": 0, "inserted": 0, "updated": 0, "failed_rows": 0}
+    try:
+        chunks = await asyncio.to_thread(read_import_chunks, path, filename)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            valid, report = validate_import_chunk(chunk)
+            operations, skus, inserted_ids = import_operations(valid, await next_sort_order())
+            counts = {"processed_rows": len(chunk), "inserted": 0, "updated": 0, "failed_rows": len(report)}
+            if operations:
+                try:
+                    result = await db.products.bulk_write(operations, ordered=False)
+                    details = result.bulk_api_result
+                except BulkWriteError as e:
+                    details = e.details
+                    rows = [int(i) + 2 for i in valid.index]
+                    for write_error in details.get("writeErrors", []):
+                        report.append({"row": rows[write_error["index"]], "errors": [write_error.get("errmsg", "write failed")]})
+                    counts["failed_rows"] += len(details.get("writeErrors", []))
+                counts["inserted"] = details.get("nInserted", 0) + details.get("nUpserted", 0)
+                counts["updated"] = details.get("nMatched", 0)
+
+                touched = await db.products.find(
+                    {"$or": [{"sku": {"$in": skus}}, {"id": {"$in": inserted_ids}}]}, SEARCH_PROJECTION
+                ).to_list(None)
+                for product in touched:
+                    search_index.add(product)
+                product_catalog_changed()
+                product_search_changed()
+
+            for key, value in counts.items():
+                totals[key] += value
+            await update_import_job(job_id, {"updated_at": datetime.now(timezone.utc).isoformat()}, counts, report)
+
+        message = f"Imported {totals['inserted']} new and updated {totals['updated']} products"
+        if totals["failed_rows"]:
+            message += f", {totals['failed_rows']} rows need attention"
+        await update_import_job(job_id, {"status": "completed", "message": message,
+                                         "finished_at": datetime.now(timezone.utc).isoformat()})
+    except Exception as e:
+        logger.error(f"Import {job_id} failed: {e}")
+        await update_import_job(job_id, {"status": "failed", "message": f"Error processing file: {str(e)}",
+                                         "finished_at": datetime.now(timezone.utc).isoformat()})
+    finally:
+        os.unlink(path)
+
+async def reap_stale_import_jobs() -> Dict[str, int]:
+    # the uploaded file lived on the worker that died, so the job cannot be resumed
+    now = datetime.now(timezone.utc)
+    result = await db.import_jobs.update_many(
+        {"status": {"$in": ["queued", "running"]},
+         "$or": [{"lease_until": {"$lte": now}}, {"lease_until": {"$exists": False}}]},
+        {"$set": {"status": "failed", "message": "Import was interrupted by a server restart, please upload the file again",
+                  "finished_at": now.isoformat()}}
+    )
+    if result.modified_count:
+        logger.warning(f"Marked {result.modified_count} interrupted import jobs as failed")
+    return {"import_jobs_failed": result.modified_count}
+
+# ===================== PRODUCT ORDERING =====================
+
+# sort_order values are spaced SORT_GAP apart so a move only rewrites the moved product
+SORT_GAP = 1024
+REBALANCE_THRESHOLD = 8
+REBALANCE_BATCH_SIZE = 1000
+# held by moves as well as rebalances, so a renumbering never interleaves with a move's read and write
+rebalance_lock = asyncio.Lock()
+
+async def renumber_sort_orders() -> int:
+    # callers hold rebalance_lock
+    position = 0
+    operations = []
+    cursor = db.products.find({}, {"_id": 0, "id": 1}).sort([("sort_order", ASCENDING), ("id", ASCENDING)])
+    async for product in cursor:
+        position += 1
+        operations.append(UpdateOne({"id": product["id"]}, {"$set": {"sort_order": position * SORT_GAP}}))
+        if len(operations) >= REBALANCE_BATCH_SIZE:
+            await db.products.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.products.bulk_write(operations, ordered=False)
+    return position
+
+async def rebalance_sort_orders() -> int:
+    async with rebalance_lock:
+        position = await renumber_sort_orders()
+    product_catalog_changed()
+    return position
+
+async def next_sort_order() -> int:
+    # new products append after the last one instead of piling up on a shared value
+    last = await db.products.find({}, {"_id": 0, "sort_order": 1}).sort("sort_order", DESCENDING).limit(1).to_list(1)
+    return (last[0].get("sort_order", 0) if last else 0) + SORT_GAP
+
+async def adjacent_product(anchor: Dict[str, Any], direction: int, exclude_id: str) -> Optional[Dict[str, Any]]:
+    # the product listed right after (ASCENDING) or before (DESCENDING) the anchor, in (sort_order, id) order
+    op = "$gt" if direction == ASCENDING else "$lt"
+    value = anchor.get("sort_order", 0)
+    neighbours = await db.products.find(
+        {"id": {"$ne": exclude_id}, "$or": [
+            {"sort_order": {op: value}},
+            {"sort_order": value, "id": {op: anchor["id"]}},
+        ]},
+        {"_id": 0, "id": 1, "sort_order": 1}
+    ).sort([("sort_order", direction), ("id", direction)]).limit(1).to_list(1)
+    return neighbours[0] if neighbours else None
+
+async def sort_order_between(product_id: str, after_id: Optional[str], before_id: Optional[str]) -> tuple:
+    # (sort_order or None when there is no room, whether the gap is getting crowded)
+    ids = [pid for pid in (after_id, before_id) if pid]
+    found = await db.products.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "sort_order": 1}).to_list(2)
+    by_id = {p["id"]: p for p in found}
+    if any(pid not in by_id for pid in ids):
+        raise HTTPException(status_code=404, detail="Neighbour product not found")
+
+    # a one-sided drop lands between the anchor and whatever currently sits next to it
+    after = by_id.get(after_id) if after_id else await adjacent_product(by_id[before_id], DESCENDING, product_id)
+    before = by_id.get(before_id) if before_id else await adjacent_product(by_id[after_id], ASCENDING, product_id)
+    if after is None:
+        return before.get("sort_order", 0) - SORT_GAP, False
+    if before is None:
+        return after.get("sort_order", 0) + SORT_GAP, False
+    low, high = after.get("sort_order", 0), before.get("sort_order", 0)
+    if high - low < 2:
+        return None, True
+    return (low + high) // 2, high - low < REBALANCE_THRESHOLD
 
 # ===================== PRODUCT ROUTES =====================
 
 @api_router.get("/products")
-async def get_products(category: Optional[str] = None, search: Optional[str] = None):
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    view: str = "full"
+):
+    projection = view_projection(PRODUCT_VIEWS, view)
     query = {}
     if category:
         query["category"] = category
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
-    
-    products = await db.products.find(query, {"_id": 0}).sort("sort_order", 1).to_list(1000)
-    return products
+    if stream and not search:
+        return stream_ndjson(db.products, query, "sort_order", ASCENDING, projection)
+
+    async def fetch():
+        if search:
+            ranked = search_index.search(search, category)
+            if limit or cursor:
+                return await paginate_ranked(ranked, limit, cursor, projection)
+            if not ranked:
+                return []
+            scores = dict(ranked)
+            products = await db.products.find({"id": {"$in": list(scores)}}, projection).to_list(len(scores))
+            products.sort(key=lambda p: (-scores.get(p["id"], 0.0), p.get("sort_order", 0)))
+            return products
+        if limit or cursor:
+            return await paginate(db.products, query, "sort_order", ASCENDING, limit, cursor, projection)
+        return await db.products.find(query, projection).sort("sort_order", 1).to_list(1000)
+
+    async def load():
+        result = await fetch()
+        if view == "grid":
+            trim_grid_descriptions(result["items"] if isinstance(result, dict) else result)
+        return result
+
+    key = f"products:{view}:{category or ''}:{normalize_text(search or '')}:{limit or ''}:{cursor or ''}"
+    return await cached_catalog_response(request, key, load)
+
+# carts revalidate every line in one request instead of one /products/{id} call each
+MAX_LOOKUP_IDS = int(os.environ.get('MAX_LOOKUP_IDS', '100'))
+LOOKUP_PROJECTION = {"_id": 0, "id": 1, "price": 1, "quantity": 1}
+
+@api_router.get("/products/lookup")
+async def lookup_products(request: Request, ids: str = Query(..., description="Comma-separated product ids")):
+    # sorted so the same cart always hits the same cache entry
+    product_ids = sorted({product_id.strip() for product_id in ids.split(",") if product_id.strip()})
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="No product ids given")
+    if len(product_ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_IDS} product ids per lookup")
+
+    async def load():
+        products = await db.products.find({"id": {"$in": product_ids}}, LOOKUP_PROJECTION).to_list(len(product_ids))
+        by_id = {p["id"]: p for p in products}
+        return {
+            "products": [
+                {
+                    "id": product_id,
+                    "price": by_id[product_id].get("price", 0.0),
+                    "quantity": by_id[product_id].get("quantity", 0),
+                    "available": by_id[product_id].get("quantity", 0) > 0,
+                }
+                for product_id in product_ids if product_id in by_id
+            ],
+            "missing": [product_id for product_id in product_ids if product_id not in by_id],
+        }
+
+    return await cached_catalog_response(request, "lookup:" + ",".join(product_ids), load)
 
 @api_router.get("/products/{product_id}")
-async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+async def get_product(product_id: str, request: Request):
+    async def load():
+        product = await db.products.find_one({"id": product_id}, PRODUCT_PROJECTION)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return product
+
+    return await cached_catalog_response(request, f"product:{product_id}", load)
 
 @api_router.post("/products")
 async def create_product(product: ProductCreate, admin = Depends(get_current_admin)):
-    product_doc = Product(**product.model_dump())
+    product_doc = Product(**product.model_dump(), sort_order=await next_sort_order())
     doc = product_doc.model_dump()
-    await db.products.insert_one(doc)
+    try:
+        await db.products.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="SKU already exists")
+    search_index.add(doc)
+    product_catalog_changed()
+    product_search_changed()
     return {"id": doc["id"], "message": "Product created"}
 
 @api_router.put("/products/{product_id}")
 async def update_product(product_id: str, product: ProductCreate, admin = Depends(get_current_admin)):
     update_data = product.model_dump()
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    result = await db.products.update_one({"id": product_id}, {"$set": update_data})
+    try:
+        result = await db.products.update_one({"id": product_id}, {"$set": update_data})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="SKU already exists")
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    search_index.add({"id": product_id, **update_data})
+    product_catalog_changed()
+    product_search_changed()
     return {"message": "Product updated"}
 
 @api_router.delete("/products/{product_id}")
@@ -282,58 +1853,520 @@ async def delete_product(product_id: str, admin = Depends(get_current_admin)):
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    search_index.remove(product_id)
+    product_catalog_changed()
+    product_search_changed()
     return {"message": "Product deleted"}
 
 @api_router.post("/products/upload-excel")
 async def upload_products_excel(file: UploadFile = File(...), admin = Depends(get_current_admin)):
-    contents = await file.read()
+    filename = (file.filename or "").lower()
+    suffix = Path(filename).suffix or ".csv"
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
     try:
-        if file.filename.endswith('.xlsx'):
-            df = pd.read_excel(BytesIO(contents), engine='openpyxl')
-        elif file.filename.endswith('.xls'):
-            df = pd.read_excel(BytesIO(contents), engine='xlrd')
-        else:
-            df = pd.read_csv(BytesIO(contents))
-        
-        products_added = 0
-        for _, row in df.iterrows():
-            product_doc = Product(
-                name=str(row.get('name', '')),
-                description=str(row.get('description', '')),
-                price=float(row.get('price', 0)),
-                category=str(row.get('category', 'General')),
-                quantity=int(row.get('quantity', 0)),
-                sku=str(row.get('sku', '')),
-                image_url=str(row.get('image_url', ''))
-            )
-            await db.products.insert_one(product_doc.model_dump())
-            products_added += 1
-        
-        return {"message": f"Successfully added {products_added} products"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        while chunk := await file.read(IMPORT_UPLOAD_CHUNK):
+            await asyncio.to_thread(tmp.write, chunk)
+        await asyncio.to_thread(tmp.close)
+    except BaseException:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+
+    job_id = str(uuid.uuid4())
+    await db.import_jobs.insert_one({
+        "id": job_id,
+        "filename": file.filename,
+        "status": "queued",
+        "processed_rows": 0,
+        "inserted": 0,
+        "updated": 0,
+        "failed_rows": 0,
+        "errors": [],
+        "message": "",
+        "created_by": admin["email"],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "lease_until": import_job_lease()
+    })
+    spawn_background(run_product_import(job_id, tmp.name, filename))
+    return {"job_id": job_id, "status": "queued", "message": "Import started"}
+
+@api_router.get("/products/import-jobs/{job_id}")
+async def get_import_job(job_id: str, admin = Depends(get_current_admin)):
+    job = await db.import_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @api_router.put("/products/sort/update")
 async def update_product_sort(updates: List[ProductSortUpdate], admin = Depends(get_current_admin)):
-    for update in updates:
-        await db.products.update_one(
-            {"id": update.product_id},
-            {"$set": {"sort_order": update.sort_order}}
-        )
-    return {"message": "Sort order updated"}
+    if not updates:
+        return {"message": "Sort order updated", "matched": 0}
+    operations = [
+        UpdateOne({"id": update.product_id}, {"$set": {"sort_order": update.sort_order}})
+        for update in updates
+    ]
+    result = await db.products.bulk_write(operations, ordered=False)
+    product_catalog_changed()
+    return {"message": "Sort order updated", "matched": result.matched_count}
+
+@api_router.put("/products/sort/move")
+async def move_product(move: ProductMove, admin = Depends(get_current_admin)):
+    if not move.after_id and not move.before_id:
+        raise HTTPException(status_code=400, detail="after_id or before_id is required")
+    async with rebalance_lock:
+        sort_order, crowded = await sort_order_between(move.product_id, move.after_id, move.before_id)
+        if sort_order is None:
+            await renumber_sort_orders()
+            sort_order, crowded = await sort_order_between(move.product_id, move.after_id, move.before_id)
+        if sort_order is None:
+            raise HTTPException(status_code=409, detail="Could not place product, try again")
+
+        result = await db.products.update_one({"id": move.product_id}, {"$set": {"sort_order": sort_order}})
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Product not found")
+    product_catalog_changed()
+    if crowded:
+        # only after the move is written, so the renumbering sees the new position
+        spawn_background(rebalance_sort_orders())
+    return {"message": "Product moved", "sort_order": sort_order}
+
+@api_router.post("/products/sort/rebalance")
+async def rebalance_product_sort(admin = Depends(get_current_admin)):
+    count = await rebalance_sort_orders()
+    return {"message": "Sort order rebalanced", "products": count}
 
 @api_router.get("/categories")
-async def get_categories():
-    categories = await db.products.distinct("category")
-    return categories
+async def get_categories(request: Request):
+    async def load():
+        return await db.products.distinct("category")
+
+    return await cached_catalog_response(request, "categories", load)
+
+# ===================== STOREFRONT BOOTSTRAP =====================
+
+FEATURED_PRODUCT_COUNT = int(os.environ.get('FEATURED_PRODUCT_COUNT', '6'))
+
+async def load_storefront_bootstrap() -> Dict[str, Any]:
+    # no timestamps in the payload, so every worker derives the same ETag for the same data
+    featured, categories, contact, about = await asyncio.gather(
+        db.products.find({}, PRODUCT_VIEWS["grid"]).sort("sort_order", 1).to_list(FEATURED_PRODUCT_COUNT),
+        db.products.aggregate([
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]).to_list(None),
+        read_site_settings("contact", SiteSettings),
+        read_site_settings("about", AboutContent),
+    )
+    return {
+        "settings": {"contact": contact, "about": about},
+        "categories": [{"name": c["_id"], "count": c["count"]} for c in categories if c["_id"]],
+        "featured": trim_grid_descriptions(featured),
+    }
+
+@api_router.get("/storefront/bootstrap")
+async def get_storefront_bootstrap(request: Request):
+    # the ETag is the payload version; clients send it back in If-None-Match and get a 304 when nothing changed
+    return await cached_catalog_response(request, "storefront:bootstrap", load_storefront_bootstrap)
+
+# ===================== ANALYTICS ROLLUP =====================
+
+# analytics_rollup holds one "totals" document plus one document per category
+ROLLUP_TOTALS_ID = "totals"
+# what the live increments have counted: paid orders whose rollup effect landed and whose
+# cancellation reversal has not yet, so a rebuild agrees with the effects still to be applied
+REVENUE_ORDER_MATCH = {
+    "payment_status": "paid",
+    "effects_pending": {"$ne": "rollup"},
+    "$or": [{"status": {"$ne": "cancelled"}}, {"effects_pending": "unrollup"}],
+}
+# rebuilds and backfills hold this lease; live increments wait for it so none lands between
+# a rebuild's aggregation and its writes
+ROLLUP_LEASE_ID = "analytics-rollup"
+ROLLUP_LEASE_SECONDS = int(os.environ.get('ROLLUP_LEASE_SECONDS', '1800'))
+# lets increments that checked the lease just before it was taken finish first
+ROLLUP_APPLY_GRACE = 2.0
+
+# rollup documents remember the last few order changes applied to them, so a retried apply is a no-op
+ROLLUP_MARKERS = 200
+
+def rollup_category_id(category: str) -> str:
+    return f"category:{category}"
+
+def rollup_marker(order: Dict[str, Any], sign: int) -> str:
+    return f"{order['id']}:{'+' if sign > 0 else '-'}"
+
+def guarded_update(filter: Dict[str, Any], update: Dict[str, Any], marker: Optional[str]) -> UpdateOne:
+    if marker is None:
+        return UpdateOne(filter, update, upsert=True)
+    return UpdateOne(
+        {**filter, "applied": {"$ne": marker}},
+        {**update, "$push": {"applied": {"$each": [marker], "$slice": -ROLLUP_MARKERS}}},
+        upsert=True
+    )
+
+async def guarded_bulk_write(collection, operations: List[UpdateOne]):
+    # a guarded upsert that misses an existing document collides on _id: that document already has the change
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+async def product_categories(product_ids: List[str]) -> Dict[str, str]:
+    products = await db.products.find(
+        {"id": {"$in": list(set(product_ids))}}, {"_id": 0, "id": 1, "category": 1}
+    ).to_list(None)
+    return {p["id"]: p.get("category", "Other") for p in products}
+
+async def apply_order_to_rollup(order: Dict[str, Any], sign: int = 1):
+    items = order.get("items", [])
+    categories = await product_categories([item.get("product_id") for item in items])
+    category_sales: Dict[str, float] = {}
+    for item in items:
+        category = categories.get(item.get("product_id"))
+        if category is None:
+            continue
+        category_sales[category] = category_sales.get(category, 0) + item.get("price", 0) * item.get("quantity", 0)
+
+    now = datetime.now(timezone.utc).isoformat()
+    marker = rollup_marker(order, sign)
+    operations = [guarded_update(
+        {"_id": ROLLUP_TOTALS_ID},
+        {"$inc": {"paid_orders": sign, "total_revenue": sign * order.get("total_amount", 0)},
+         "$set": {"updated_at": now}},
+        marker
+    )]
+    for category, amount in category_sales.items():
+        operations.append(guarded_update(
+            {"_id": rollup_category_id(category)},
+            {"$inc": {"revenue": sign * amount}, "$set": {"category": category, "updated_at": now}},
+            marker
+        ))
+    await guarded_bulk_write(db.analytics_rollup, operations)
+    await apply_order_to_sales_buckets(order, categories, sign, marker)
+
+async def read_analytics_rollup() -> Optional[Dict[str, Any]]:
+    docs = await db.analytics_rollup.find({}).to_list(None)
+    totals = next((d for d in docs if d["_id"] == ROLLUP_TOTALS_ID), None)
+    # a totals document made by a live $inc upsert before any rebuild holds only recent orders
+    if totals is None or not totals.get("rebuilt_at"):
+        return None
+    category_sales = {d["category"]: d.get("revenue", 0) for d in docs if d["_id"] != ROLLUP_TOTALS_ID}
+    return {
+        "paid_orders": totals.get("paid_orders", 0),
+        "total_revenue": totals.get("total_revenue", 0),
+        "category_sales": {k: v for k, v in category_sales.items() if abs(v) > 1e-9},
+        "updated_at": totals.get("updated_at"),
+    }
+
+# archived orders still count towards revenue
+ARCHIVED_REVENUE_UNION = {"$unionWith": {"coll": "orders_archive", "pipeline": [{"$match": REVENUE_ORDER_MATCH}]}}
+
+async def aggregate_paid_order_totals() -> Dict[str, Any]:
+    pipeline = [
+        {"$match": REVENUE_ORDER_MATCH},
+        ARCHIVED_REVENUE_UNION,
+        {"$group": {"_id": None, "paid_orders": {"$sum": 1}, "total_revenue": {"$sum": "$total_amount"}}},
+    ]
+    result = await db.orders.aggregate(pipeline).to_list(1)
+    return result[0] if result else {"paid_orders": 0, "total_revenue": 0}
+
+async def aggregate_category_sales() -> Dict[str, float]:
+    pipeline = [
+        {"$match": REVENUE_ORDER_MATCH},
+        ARCHIVED_REVENUE_UNION,
+        {"$unwind": "$items"},
+        {"$lookup": {
+            "from": "products",
+            "localField": "items.product_id",
+            "foreignField": "id",
+            "as": "product",
+        }},
+        {"$unwind": "$product"},
+        {"$group": {
+            "_id": {"$ifNull": ["$product.category", "Other"]},
+            "revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}},
+        }},
+    ]
+    result = await db.orders.aggregate(pipeline, allowDiskUse=True).to_list(None)
+    return {row["_id"]: row["revenue"] for row in result}
+
+async def rollup_rebuild_running() -> bool:
+    lease = await db.scheduler_leases.find_one(
+        {"_id": ROLLUP_LEASE_ID, "lease_until": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1}
+    )
+    return lease is not None
+
+async def run_under_rollup_lease(rebuild):
+    owner = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    try:
+        lease = await db.scheduler_leases.find_one_and_update(
+            {"_id": ROLLUP_LEASE_ID, "lease_until": {"$lte": now}},
+            {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=ROLLUP_LEASE_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        lease = None
+    if lease is None or lease.get("owner") != owner:
+        raise HTTPException(status_code=409, detail="Analytics are being rebuilt, please retry shortly")
+    try:
+        await asyncio.sleep(ROLLUP_APPLY_GRACE)
+        return await rebuild()
+    finally:
+        await db.scheduler_leases.update_one(
+            {"_id": ROLLUP_LEASE_ID, "owner": owner}, {"$set": {"lease_until": datetime.now(timezone.utc)}}
+        )
+
+rollup_rebuild_flight = SingleFlight()
+
+async def rebuild_analytics_rollup() -> Dict[str, Any]:
+    # concurrent dashboard loads share one rebuild
+    return await rollup_rebuild_flight.do("rollup", lambda: run_under_rollup_lease(run_rollup_rebuild))
+
+async def ensure_analytics_rollup() -> Dict[str, Any]:
+    rollup = await read_analytics_rollup()
+    if rollup is None:
+        await rebuild_analytics_rollup()
+        rollup = await read_analytics_rollup()
+    return rollup
+
+async def run_rollup_rebuild() -> Dict[str, Any]:
+    totals = await aggregate_paid_order_totals()
+    category_sales = await aggregate_category_sales()
+    now = datetime.now(timezone.utc).isoformat()
+    docs = [{
+        "_id": ROLLUP_TOTALS_ID,
+        "paid_orders": totals["paid_orders"],
+        "total_revenue": totals["total_revenue"],
+        "updated_at": now,
+        "rebuilt_at": now,
+    }]
+    docs.extend(
+        {"_id": rollup_category_id(category), "category": category, "revenue": revenue, "updated_at": now}
+        for category, revenue in category_sales.items()
+    )
+    # the lease keeps live increments out, so nothing lands between the aggregation and these writes
+    await db.analytics_rollup.bulk_write([
+        ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs
+    ], ordered=False)
+    await db.analytics_rollup.delete_many({"_id": {"$nin": [doc["_id"] for doc in docs]}})
+    return {"paid_orders": totals["paid_orders"], "total_revenue": totals["total_revenue"], "categories": len(category_sales)}
+
+# ===================== SALES BUCKETS =====================
+
+# sales_buckets: revenue/orders/units per hour and per day
+# sales_bucket_items: the same per product and per category within each bucket
+BUCKET_GRANULARITIES = ("hour", "day")
+BACKFILL_BATCH_SIZE = 1000
+MAX_SERIES_POINTS = 24 * 400
+
+def parse_timestamp(value: Any) -> datetime:
+    ts = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return ts if granularity == "hour" else ts.replace(hour=0)
+
+def order_sale_time(order: Dict[str, Any]) -> datetime:
+    return parse_timestamp(order.get("paid_at") or order.get("created_at"))
+
+class BucketAccumulator:
+    def __init__(self):
+        self.totals: Dict[tuple, Dict[str, float]] = {}
+        self.items: Dict[tuple, Dict[str, Any]] = {}
+
+    def add_order(self, order: Dict[str, Any], categories: Dict[str, str], sign: int = 1):
+        sold_at = order_sale_time(order)
+        for granularity in BUCKET_GRANULARITIES:
+            bucket = bucket_start(sold_at, granularity).isoformat()
+            totals = self.totals.setdefault((granularity, bucket), {"revenue": 0.0, "orders": 0, "units": 0})
+            totals["revenue"] += sign * order.get("total_amount", 0)
+            totals["orders"] += sign
+            for item in order.get("items", []):
+                units = item.get("quantity", 0)
+                revenue = item.get("price", 0) * units
+                totals["units"] += sign * units
+                keys = [("product", item.get("product_id"), item.get("name", ""))]
+                category = categories.get(item.get("product_id"))
+                if category is not None:
+                    keys.append(("category", category, category))
+                for kind, key, name in keys:
+                    entry = self.items.setdefault(
+                        (granularity, bucket, kind, key), {"name": name, "revenue": 0.0, "units": 0}
+                    )
+                    entry["revenue"] += sign * revenue
+                    entry["units"] += sign * units
+
+    def operations(self, marker: Optional[str] = None) -> tuple:
+        bucket_ops = [
+            guarded_update(
+                {"_id": f"{granularity}:{bucket}"},
+                {"$inc": values, "$set": {"granularity": granularity, "bucket": bucket}},
+                marker
+            )
+            for (granularity, bucket), values in self.totals.items()
+        ]
+        item_ops = [
+            guarded_update(
+                {"_id": f"{granularity}:{bucket}:{kind}:{key}"},
+                {"$inc": {"revenue": entry["revenue"], "units": entry["units"]},
+                 "$set": {"granularity": granularity, "bucket": bucket, "kind": kind, "key": key, "name": entry["name"]}},
+                marker
+            )
+            for (granularity, bucket, kind, key), entry in self.items.items()
+        ]
+        return bucket_ops, item_ops
+
+    async def flush(self, marker: Optional[str] = None):
+        bucket_ops, item_ops = self.operations(marker)
+        if bucket_ops:
+            await guarded_bulk_write(db.sales_buckets, bucket_ops)
+        if item_ops:
+            await guarded_bulk_write(db.sales_bucket_items, item_ops)
+        self.totals.clear()
+        self.items.clear()
+
+async def apply_order_to_sales_buckets(order: Dict[str, Any], categories: Dict[str, str], sign: int = 1,
+                                       marker: Optional[str] = None):
+    accumulator = BucketAccumulator()
+    accumulator.add_order(order, categories, sign)
+    await accumulator.flush(marker)
+
+async def backfill_sales_buckets(batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, Any]:
+    return await run_under_rollup_lease(lambda: run_sales_backfill(batch_size))
+
+async def run_sales_backfill(batch_size: int) -> Dict[str, Any]:
+    await db.sales_buckets.delete_many({})
+    await db.sales_bucket_items.delete_many({})
+    projection = {"_id": 0, "items": 1, "total_amount": 1, "paid_at": 1, "created_at": 1}
+    processed = 0
+    batch: List[Dict[str, Any]] = []
+
+    async def flush_batch():
+        product_ids = [item.get("product_id") for order in batch for item in order.get("items", [])]
+        categories = await product_categories(product_ids)
+        accumulator = BucketAccumulator()
+        for order in batch:
+            accumulator.add_order(order, categories)
+        await accumulator.flush()
+        batch.clear()
+
+    for collection in (db.orders, db.orders_archive):
+        cursor = collection.find(REVENUE_ORDER_MATCH, projection).sort("created_at", 1).batch_size(batch_size)
+        async for order in cursor:
+            batch.append(order)
+            processed += 1
+            if len(batch) >= batch_size:
+                await flush_batch()
+    if batch:
+        await flush_batch()
+    return {"orders": processed, "buckets": await db.sales_buckets.estimated_document_count()}
+
+def series_points(start: datetime, end: datetime, granularity: str) -> List[str]:
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    points = []
+    current = bucket_start(start, granularity)
+    while current <= end and len(points) < MAX_SERIES_POINTS:
+        points.append(current.isoformat())
+        current += step
+    return points
+
+async def top_bucket_items(kind: str, granularity: str, start: str, end: str, limit: int) -> List[Dict[str, Any]]:
+    pipeline = [
+        {"$match": {"granularity": granularity, "kind": kind, "bucket": {"$gte": start, "$lte": end}}},
+        {"$group": {"_id": "$key", "name": {"$last": "$name"}, "revenue": {"$sum": "$revenue"}, "units": {"$sum": "$units"}}},
+        {"$match": {"units": {"$gt": 0}}},
+        {"$sort": {"revenue": -1}},
+        {"$limit": limit},
+    ]
+    rows = await db.sales_bucket_items.aggregate(pipeline).to_list(limit)
+    return [{"key": r["_id"], "name": r["name"], "revenue": r["revenue"], "units": r["units"]} for r in rows]
+
+# ===================== STOCK RESERVATION =====================
+
+def item_quantities(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    quantities: Dict[str, int] = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+    return quantities
+
+async def clear_stock_holds(order_id: str, product_ids: List[str]):
+    await db.products.update_many(
+        {"id": {"$in": product_ids}, "stock_holds": order_id},
+        {"$pull": {"stock_holds": order_id}}
+    )
+
+async def reserve_stock(order_id: str, quantities: Dict[str, int]) -> List[str]:
+    # stock_holds marks which conditional decrements matched so a partial reservation can be undone
+    operations = [
+        UpdateOne(
+            {"id": product_id, "quantity": {"$gte": quantity}},
+            {"$inc": {"quantity": -quantity}, "$addToSet": {"stock_holds": order_id}}
+        )
+        for product_id, quantity in quantities.items()
+    ]
+    result = await db.products.bulk_write(operations, ordered=False)
+    product_ids = list(quantities)
+    if result.matched_count == len(operations):
+        spawn_background(clear_stock_holds(order_id, product_ids))
+        return []
+
+    held = await db.products.find(
+        {"id": {"$in": product_ids}, "stock_holds": order_id}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    held_ids = {p["id"] for p in held}
+    if held_ids:
+        await db.products.bulk_write([
+            UpdateOne(
+                {"id": product_id, "stock_holds": order_id},
+                {"$inc": {"quantity": quantities[product_id]}, "$pull": {"stock_holds": order_id}}
+            )
+            for product_id in held_ids
+        ], ordered=False)
+    return [product_id for product_id in product_ids if product_id not in held_ids]
+
+async def release_stock(quantities: Dict[str, int]):
+    if not quantities:
+        return
+    await db.products.bulk_write([
+        UpdateOne({"id": product_id}, {"$inc": {"quantity": quantity}})
+        for product_id, quantity in quantities.items()
+    ], ordered=False)
+    product_catalog_changed()
 
 # ===================== ORDER ROUTES =====================
 
 @api_router.post("/orders")
 async def create_order(order: OrderCreate):
-    total = sum(item.price * item.quantity for item in order.items)
+    if not order.items:
+        raise HTTPException(status_code=400, detail="Order has no items")
+    if any(item.quantity <= 0 for item in order.items):
+        raise HTTPException(status_code=400, detail="Item quantity must be positive")
+
+    quantities = item_quantities([item.model_dump() for item in order.items])
+    products = await db.products.find(
+        {"id": {"$in": list(quantities)}}, {"_id": 0, "id": 1, "name": 1, "price": 1}
+    ).to_list(len(quantities))
+    by_id = {p["id"]: p for p in products}
+    missing = [product_id for product_id in quantities if product_id not in by_id]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Products not found: {', '.join(missing)}")
+
+    items = [
+        OrderItem(
+            product_id=product_id,
+            name=by_id[product_id]["name"],
+            price=float(by_id[product_id]["price"]),
+            quantity=quantity
+        )
+        for product_id, quantity in quantities.items()
+    ]
+    total = round(sum(item.price * item.quantity for item in items), 2)
     order_doc = Order(
-        items=[item.model_dump() for item in order.items],
+        items=items,
         total_amount=total,
         customer_name=order.customer_name,
         customer_email=order.customer_email,
@@ -341,60 +2374,371 @@ async def create_order(order: OrderCreate):
         customer_address=order.customer_address
     )
     doc = order_doc.model_dump()
-    await db.orders.insert_one(doc)
+
+    short = await reserve_stock(doc["id"], quantities)
+    if short:
+        names = ", ".join(by_id[product_id]["name"] for product_id in short)
+        raise HTTPException(status_code=409, detail=f"Insufficient stock for: {names}")
+    product_catalog_changed()
+
+    doc["stock_reserved"] = True
+    try:
+        await db.orders.insert_one(doc)
+    except Exception:
+        await release_stock(quantities)
+        raise
     return {"id": doc["id"], "total_amount": total}
 
 @api_router.get("/orders")
-async def get_orders(status: Optional[str] = None, admin = Depends(get_current_admin)):
+async def get_orders(
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    view: str = "full",
+    admin = Depends(get_current_admin)
+):
+    projection = view_projection(ORDER_VIEWS, view)
     query = {}
     if status:
         query["status"] = status
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return orders
+    if stream:
+        return stream_ndjson(db.orders, query, "created_at", DESCENDING, projection)
+    if limit or cursor:
+        return json_response(await paginate(db.orders, query, "created_at", DESCENDING, limit, cursor, projection))
+    return await legacy_list(db.orders, query, projection)
 
 @api_router.get("/orders/{order_id}")
 async def get_order(order_id: str):
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    if not order:
+        order = await db.orders_archive.find_one({"id": order_id}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
+# ===================== ORDER STATUS =====================
+
+# allowed moves per status; delivered, cancelled and expired are final
+ORDER_TRANSITIONS = {
+    "pending": {"confirmed", "processing", "cancelled"},
+    "confirmed": {"processing", "shipped", "cancelled"},
+    "processing": {"shipped", "cancelled"},
+    "shipped": {"delivered"},
+    "delivered": set(),
+    "cancelled": set(),
+    "expired": set(),
+}
+MAX_BULK_ORDERS = int(os.environ.get('MAX_BULK_ORDERS', '500'))
+ROLLUP_CONCURRENCY = 8
+
+def order_holds_stock(order: Dict[str, Any]) -> bool:
+    # orders from before reservation existed have no stock_reserved field; paid ones took stock at payment
+    if "stock_reserved" not in order:
+        return order.get("payment_status") == "paid"
+    return bool(order["stock_reserved"])
+
+def held_quantities(order: Dict[str, Any]) -> Dict[str, int]:
+    # lines a paid order could not take stock for were never decremented
+    short = set(order.get("stock_shortfall", []))
+    return {pid: quantity for pid, quantity in item_quantities(order.get("items", [])).items() if pid not in short}
+
+def stock_reserved_filter(order: Dict[str, Any]) -> Any:
+    if "stock_reserved" not in order:
+        return {"$exists": False}
+    return True if order["stock_reserved"] else {"$ne": True}
+
+async def change_order_statuses(order_ids: List[str], status: str) -> List[Dict[str, Any]]:
+    if status not in ORDER_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown order status: {status}")
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = await db.orders.find({"id": {"$in": order_ids}}, {"_id": 0}).to_list(len(order_ids))
+    by_id = {order["id"]: order for order in orders}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    candidates: List[Dict[str, Any]] = []
+    for order_id in order_ids:
+        order = by_id.get(order_id)
+        if order is None:
+            results[order_id] = {"id": order_id, "result": "not_found"}
+            continue
+        current = order.get("status", "pending")
+        if current == status:
+            results[order_id] = {"id": order_id, "result": "unchanged", "from": current}
+        elif status not in ORDER_TRANSITIONS.get(current, set()):
+            results[order_id] = {"id": order_id, "result": "invalid_transition", "from": current}
+        else:
+            candidates.append(order)
+
+    if candidates:
+        run_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc).isoformat()
+        update = {"status": status, "updated_at": now, "status_run": run_id}
+        if status == "cancelled":
+            update["stock_reserved"] = False
+
+        def status_update(order):
+            if status == "cancelled" and order.get("payment_status") == "paid":
+                # the rollup reversal rides on the cancel itself, so it survives a crash after it
+                return {"$set": update, "$addToSet": {"effects_pending": "unrollup"}}
+            return {"$set": update}
+
+        # conditional on what we read, so a concurrent change (or a second cancel) makes the write miss
+        result = await db.orders.bulk_write([
+            UpdateOne(
+                {"id": order["id"], "status": order.get("status", "pending"),
+                 "stock_reserved": stock_reserved_filter(order)},
+                status_update(order)
+            )
+            for order in candidates
+        ], ordered=False)
+        applied = candidates
+        if result.modified_count < len(candidates):
+            marked = await db.orders.find(
+                {"id": {"$in": [order["id"] for order in candidates]}, "status_run": run_id}, {"_id": 0, "id": 1}
+            ).to_list(None)
+            marked_ids = {order["id"] for order in marked}
+            applied = [order for order in candidates if order["id"] in marked_ids]
+        applied_ids = {order["id"] for order in applied}
+        for order in candidates:
+            outcome = "updated" if order["id"] in applied_ids else "conflict"
+            results[order["id"]] = {"id": order["id"], "result": outcome, "from": order.get("status", "pending")}
+
+        if status == "cancelled":
+            quantities: Dict[str, int] = {}
+            for order in applied:
+                if order_holds_stock(order):
+                    for product_id, quantity in held_quantities(order).items():
+                        quantities[product_id] = quantities.get(product_id, 0) + quantity
+            await release_stock(quantities)
+
+            # rollup increments commute, so paid cancellations can be applied side by side
+            semaphore = asyncio.Semaphore(ROLLUP_CONCURRENCY)
+
+            async def remove_from_rollup(order):
+                async with semaphore:
+                    try:
+                        await apply_rollup_effect(order, "unrollup")
+                    except Exception as e:
+                        # still recorded on the order; the maintenance sweep finishes it
+                        logger.error(f"Rollup reversal for order {order['id']} failed: {e}")
+
+            await asyncio.gather(*(
+                remove_from_rollup(order) for order in applied if order.get("payment_status") == "paid"
+            ))
+    return [results[order_id] for order_id in order_ids]
+
 @api_router.put("/orders/{order_id}/status")
 async def update_order_status(order_id: str, status: str, admin = Depends(get_current_admin)):
-    order = await db.orders.find_one({"id": order_id})
-    if not order:
+    result = (await change_order_statuses([order_id], status))[0]
+    if result["result"] == "not_found":
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    if status == "cancelled" and order.get("status") != "cancelled":
-        for item in order.get("items", []):
-            await db.products.update_one(
-                {"id": item["product_id"]},
-                {"$inc": {"quantity": item["quantity"]}}
-            )
-    
-    await db.orders.update_one(
-        {"id": order_id},
-        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    if result["result"] == "invalid_transition":
+        raise HTTPException(status_code=409, detail=f"Cannot change order status from {result['from']} to {status}")
+    if result["result"] == "conflict":
+        raise HTTPException(status_code=409, detail="Order was changed concurrently, please retry")
     return {"message": "Order status updated"}
 
+@api_router.post("/orders/bulk-status")
+async def bulk_update_order_status(payload: BulkOrderStatusUpdate, admin = Depends(get_current_admin)):
+    if not payload.order_ids:
+        raise HTTPException(status_code=400, detail="No orders given")
+    if len(payload.order_ids) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ORDERS} orders per request")
+    results = await change_order_statuses(payload.order_ids, payload.status)
+    summary: Dict[str, int] = {}
+    for result in results:
+        summary[result["result"]] = summary.get(result["result"], 0) + 1
+    return {"status": payload.status, "summary": summary, "results": results}
+
+# ===================== STRIPE CLIENT =====================
+
+PAYMENT_STATUS_TTL = float(os.environ.get('PAYMENT_STATUS_TTL', '3'))
+PAID_STATUS_TTL = 300.0
+PAYMENT_STATUS_CACHE_SIZE = 10000
+
+# bounded, since the webhook URL is derived from the caller-supplied origin
+STRIPE_CLIENT_CACHE_SIZE = 16
+
+stripe_clients: "OrderedDict[str, Any]" = OrderedDict()
+
+def get_stripe_checkout(webhook_url: str):
+    # one long-lived client per webhook URL keeps the SDK's HTTP session and its connections warm
+    stripe_checkout = stripe_clients.get(webhook_url)
+    if stripe_checkout is None:
+        checkout = load_dependency("stripe")
+        stripe_checkout = checkout.StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+        stripe_clients[webhook_url] = stripe_checkout
+        while len(stripe_clients) > STRIPE_CLIENT_CACHE_SIZE:
+            stripe_clients.popitem(last=False)
+    else:
+        stripe_clients.move_to_end(webhook_url)
+    return stripe_checkout
+
+def checkout_host_url(request: Request, origin_url: Optional[str]) -> str:
+    if not origin_url:
+        return str(request.base_url).rstrip('/')
+    origin = origin_url.rstrip('/')
+    if "*" not in CORS_ORIGINS and origin not in CORS_ORIGINS:
+        raise HTTPException(status_code=400, detail="origin_url is not an allowed origin")
+    return origin
+
+payment_status_cache = TTLCache(PAYMENT_STATUS_CACHE_SIZE)
+payment_status_flight = SingleFlight()
+
 # ===================== PAYMENT ROUTES =====================
 
+# final statuses a late payment must not reopen
+CLOSED_ORDER_STATUSES = ["cancelled", "expired"]
+
+# side effects a status change leaves on the order in effects_pending, in the same write as the change;
+# each is applied idempotently and pulled once done, so a crash in between is finished by a retry
+ORDER_EFFECTS = ["stock", "rollup", "unrollup"]
+# pending effects younger than this belong to a request still in flight
+EFFECTS_RETRY_AFTER = 60
+
+async def take_order_stock(order: Dict[str, Any]) -> bool:
+    order_id = order["id"]
+    if order.get("stock_reserved"):
+        await db.orders.update_one({"id": order_id}, {"$pull": {"effects_pending": "stock"}})
+        return True
+    # orders placed before reservation existed, or whose hold was released, take stock now;
+    # stock_holds records the lines already taken, so a retry never takes them twice
+    quantities = item_quantities(order.get("items", []))
+    if order.get("status") not in CLOSED_ORDER_STATUSES:
+        await db.products.bulk_write([
+            UpdateOne(
+                {"id": product_id, "quantity": {"$gte": quantity}, "stock_holds": {"$ne": order_id}},
+                {"$inc": {"quantity": -quantity}, "$addToSet": {"stock_holds": order_id}}
+            )
+            for product_id, quantity in quantities.items()
+        ], ordered=False)
+    held = await db.products.find(
+        {"id": {"$in": list(quantities)}, "stock_holds": order_id}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    held_ids = {p["id"] for p in held}
+    short = [product_id for product_id in quantities if product_id not in held_ids]
+
+    # the order keeps the lines it could take; a cancel releases only those
+    update: Dict[str, Any] = {"$pull": {"effects_pending": "stock"}, "$set": {"stock_reserved": True}}
+    if short:
+        update["$set"]["stock_shortfall"] = short
+    # pulling the effect is the claim: only one caller settles the holds
+    result = await db.orders.update_one(
+        {"id": order_id, "effects_pending": "stock", "status": {"$nin": CLOSED_ORDER_STATUSES}}, update
+    )
+    closed = not result.matched_count
+    if closed:
+        # cancelled before the stock was recorded, so its cancel released nothing for these lines
+        result = await db.orders.update_one(
+            {"id": order_id, "effects_pending": "stock"}, {"$pull": {"effects_pending": "stock"}}
+        )
+        if not result.modified_count:
+            return True
+    if closed:
+        if held_ids:
+            await db.products.bulk_write([
+                UpdateOne(
+                    {"id": product_id, "stock_holds": order_id},
+                    {"$inc": {"quantity": quantities[product_id]}, "$pull": {"stock_holds": order_id}}
+                )
+                for product_id in held_ids
+            ], ordered=False)
+    else:
+        if short:
+            logger.warning(f"Paid order {order_id} is short of stock for: {', '.join(short)}")
+        spawn_background(clear_stock_holds(order_id, list(held_ids)))
+    if held_ids:
+        product_catalog_changed()
+    return True
+
+async def apply_rollup_effect(order: Dict[str, Any], effect: str) -> bool:
+    # a rebuild in progress would overwrite the increment; stay pending and let a retry apply it
+    if await rollup_rebuild_running():
+        return False
+    # rollup and sales bucket documents carry markers, so repeating this after a crash changes nothing
+    await apply_order_to_rollup(order, 1 if effect == "rollup" else -1)
+    await db.orders.update_one({"id": order["id"]}, {"$pull": {"effects_pending": effect}})
+    return True
+
+async def apply_order_effects(order: Dict[str, Any]) -> List[str]:
+    # returns the effects still pending
+    remaining = []
+    for effect in order.get("effects_pending", []):
+        if effect == "stock":
+            done = await take_order_stock(order)
+        elif effect in ("rollup", "unrollup"):
+            done = await apply_rollup_effect(order, effect)
+        else:
+            done = False
+        if not done:
+            remaining.append(effect)
+    return remaining
+
+async def finish_order_effects() -> Dict[str, int]:
+    # orders whose effects were interrupted by a failed write or a killed worker
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=EFFECTS_RETRY_AFTER)).isoformat()
+    stats = {"effects_finished": 0}
+    orders = await db.orders.find(
+        {"effects_pending": {"$in": ORDER_EFFECTS}, "updated_at": {"$lt": cutoff}}, {"_id": 0}
+    ).limit(MAINTENANCE_BATCH_SIZE).to_list(MAINTENANCE_BATCH_SIZE)
+    for order in orders:
+        try:
+            if not await apply_order_effects(order):
+                stats["effects_finished"] += 1
+        except Exception as e:
+            logger.error(f"Pending effects of order {order['id']} failed again: {e}")
+    return stats
+
+async def confirm_order_payment(order_query: Dict[str, Any]) -> List[str]:
+    # the pending -> paid transition records its stock and rollup effects in the same write;
+    # returns the effects still pending after this attempt
+    now = datetime.now(timezone.utc).isoformat()
+    order = await db.orders.find_one_and_update(
+        {**order_query, "payment_status": {"$nin": ["paid", "refund_required"]},
+         "status": {"$nin": CLOSED_ORDER_STATUSES}},
+        {"$set": {
+            "payment_status": "paid",
+            "status": "confirmed",
+            "paid_at": now,
+            "updated_at": now
+        },
+         "$addToSet": {"effects_pending": {"$each": ["stock", "rollup"]}}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not order:
+        # paid after the order was cancelled or expired: keep it closed and leave it for a refund
+        flagged = await db.orders.find_one_and_update(
+            {**order_query, "payment_status": {"$nin": ["paid", "refund_required"]},
+             "status": {"$in": CLOSED_ORDER_STATUSES}},
+            {"$set": {"payment_status": "refund_required", "paid_at": now, "updated_at": now}},
+            projection={"_id": 0, "id": 1, "status": 1}
+        )
+        if flagged:
+            logger.warning(f"Payment received for {flagged['status']} order {flagged['id']}; refund required")
+            return []
+        # already paid: finish whatever an earlier attempt left pending
+        order = await db.orders.find_one({**order_query, "effects_pending": {"$in": ORDER_EFFECTS}}, {"_id": 0})
+        if not order:
+            return []
+    return await apply_order_effects(order)
+
 @api_router.post("/payments/checkout")
 async def create_checkout(order_id: str, request: Request, origin_url: Optional[str] = None):
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    host_url = origin_url or str(request.base_url).rstrip('/')
+    host_url = checkout_host_url(request, origin_url)
     webhook_url = f"{host_url}/api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    
+
+    stripe_checkout = get_stripe_checkout(webhook_url)
+
     success_url = f"{host_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{host_url}/payment/cancel?order_id={order_id}"
     
-    checkout_request = CheckoutSessionRequest(
+    checkout_request = load_dependency("stripe").CheckoutSessionRequest(
         amount=float(order["total_amount"]),
         currency="usd",
         success_url=success_url,
@@ -422,48 +2766,51 @@ async def create_checkout(order_id: str, request: Request, origin_url: Optional[
     
     return {"checkout_url": session.url, "session_id": session.session_id}
 
+async def resolve_payment_status(session_id: str, webhook_url: str) -> Dict[str, Any]:
+    transaction = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+    if transaction and transaction.get("payment_status") == "paid":
+        return {
+            "status": transaction.get("status", "complete"),
+            "payment_status": "paid",
+            "amount_total": transaction.get("amount_total", int(round(transaction.get("amount", 0) * 100))),
+            "currency": transaction.get("currency", "usd")
+        }
+
+    status = await get_stripe_checkout(webhook_url).get_checkout_status(session_id)
+    if transaction:
+        await db.payment_transactions.update_one(
+            {"session_id": session_id, "payment_status": {"$ne": "paid"}},
+            {"$set": {
+                "status": status.status,
+                "payment_status": status.payment_status,
+                "amount_total": status.amount_total
+            }}
+        )
+        if status.payment_status == "paid":
+            await confirm_order_payment({"payment_session_id": session_id})
+
+    return {
+        "status": status.status,
+        "payment_status": status.payment_status,
+        "amount_total": status.amount_total,
+        "currency": status.currency
+    }
+
 @api_router.get("/payments/status/{session_id}")
 async def get_payment_status(session_id: str, request: Request):
+    cached = payment_status_cache.get(session_id)
+    if cached is not None:
+        return cached
+
     host_url = str(request.base_url).rstrip('/')
     webhook_url = f"{host_url}/api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    
     try:
-        status = await stripe_checkout.get_checkout_status(session_id)
-        
-        transaction = await db.payment_transactions.find_one({"session_id": session_id})
-        if transaction and transaction.get("payment_status") != "paid":
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {"$set": {"status": status.status, "payment_status": status.payment_status}}
-            )
-            
-            if status.payment_status == "paid":
-                order = await db.orders.find_one({"payment_session_id": session_id})
-                if order and order.get("payment_status") != "paid":
-                    await db.orders.update_one(
-                        {"payment_session_id": session_id},
-                        {"$set": {
-                            "payment_status": "paid",
-                            "status": "confirmed",
-                            "updated_at": datetime.now(timezone.utc).isoformat()
-                        }}
-                    )
-                    for item in order.get("items", []):
-                        await db.products.update_one(
-                            {"id": item["product_id"]},
-                            {"$inc": {"quantity": -item["quantity"]}}
-                        )
-        
-        return {
-            "status": status.status,
-            "payment_status": status.payment_status,
-            "amount_total": status.amount_total,
-            "currency": status.currency
-        }
+        result = await payment_status_flight.do(session_id, lambda: resolve_payment_status(session_id, webhook_url))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    ttl = PAID_STATUS_TTL if result["payment_status"] == "paid" else PAYMENT_STATUS_TTL
+    payment_status_cache.put(session_id, result, ttl)
+    return result
 
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
@@ -472,41 +2819,303 @@ async def stripe_webhook(request: Request):
     
     host_url = str(request.base_url).rstrip('/')
     webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    
+
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        if webhook_response.payment_status == "paid":
-            session_id = webhook_response.session_id
-            order_id = webhook_response.metadata.get("order_id")
-            
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {"$set": {"status": "completed", "payment_status": "paid"}}
-            )
-            
-            order = await db.orders.find_one({"id": order_id})
-            if order and order.get("payment_status") != "paid":
-                await db.orders.update_one(
-                    {"id": order_id},
-                    {"$set": {
-                        "payment_status": "paid",
-                        "status": "confirmed",
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                for item in order.get("items", []):
-                    await db.products.update_one(
-                        {"id": item["product_id"]},
-                        {"$inc": {"quantity": -item["quantity"]}}
-                    )
-        
-        return {"status": "ok"}
+        webhook_response = await get_stripe_checkout(webhook_url).handle_webhook(body, signature)
     except Exception as e:
         logging.error(f"Webhook error: {e}")
         return {"status": "error", "message": str(e)}
 
+    event_id = getattr(webhook_response, "event_id", None) or hashlib.sha256(body).hexdigest()
+    now = datetime.now(timezone.utc)
+    try:
+        await db.webhook_inbox.insert_one({
+            "_id": event_id,
+            "event_type": getattr(webhook_response, "event_type", ""),
+            "session_id": webhook_response.session_id,
+            "payment_status": webhook_response.payment_status,
+            "order_id": (webhook_response.metadata or {}).get("order_id"),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "received_at": now
+        })
+    except DuplicateKeyError:
+        return {"status": "ok", "duplicate": True}
+    webhook_wakeup.set()
+    return {"status": "ok"}
+
+# ===================== WEBHOOK INBOX =====================
+
+WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', '2'))
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_RETRY_BASE = 2.0
+WEBHOOK_LEASE_SECONDS = 60
+WEBHOOK_POLL_INTERVAL = 5.0
+
+webhook_wakeup = asyncio.Event()
+webhook_workers: List[asyncio.Task] = []
+
+async def claim_webhook_event() -> Optional[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return await db.webhook_inbox.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "processing", "locked_until": {"$lte": now}},
+        ]},
+        {"$set": {"status": "processing", "locked_until": now + timedelta(seconds=WEBHOOK_LEASE_SECONDS)},
+         "$inc": {"attempts": 1}},
+        sort=[("next_attempt_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def process_webhook_event(event: Dict[str, Any]):
+    if event.get("payment_status") != "paid":
+        return
+    session_id = event.get("session_id")
+    await db.payment_transactions.update_one(
+        {"session_id": session_id},
+        {"$set": {"status": "completed", "payment_status": "paid"}}
+    )
+    # confirm_order_payment applies the pending -> paid transition once and finishes its effects on retries
+    remaining = await confirm_order_payment({"id": event.get("order_id")})
+    payment_status_cache.drop(session_id)
+    if remaining:
+        raise RuntimeError(f"Order effects still pending: {', '.join(remaining)}")
+
+async def finish_webhook_event(event: Dict[str, Any], error: Optional[Exception]):
+    now = datetime.now(timezone.utc)
+    if error is None:
+        update = {"status": "done", "processed_at": now}
+    elif event["attempts"] >= WEBHOOK_MAX_ATTEMPTS:
+        update = {"status": "failed", "last_error": str(error), "processed_at": now}
+    else:
+        delay = WEBHOOK_RETRY_BASE ** event["attempts"]
+        update = {"status": "pending", "last_error": str(error), "next_attempt_at": now + timedelta(seconds=delay)}
+    await db.webhook_inbox.update_one({"_id": event["_id"]}, {"$set": update, "$unset": {"locked_until": ""}})
+
+async def webhook_worker(worker_id: int):
+    while True:
+        try:
+            event = await claim_webhook_event()
+        except Exception as e:
+            logger.error(f"Webhook worker {worker_id} claim failed: {e}")
+            event = None
+        if event is None:
+            webhook_wakeup.clear()
+            try:
+                await asyncio.wait_for(webhook_wakeup.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        error = None
+        try:
+            await process_webhook_event(event)
+        except Exception as e:
+            logger.error(f"Webhook event {event['_id']} attempt {event['attempts']} failed: {e}")
+            error = e
+        try:
+            await finish_webhook_event(event, error)
+        except Exception as e:
+            logger.error(f"Webhook event {event['_id']} could not be finalised: {e}")
+
+def start_webhook_workers():
+    for worker_id in range(WEBHOOK_WORKERS):
+        webhook_workers.append(asyncio.create_task(webhook_worker(worker_id)))
+
+async def stop_webhook_workers():
+    for task in webhook_workers:
+        task.cancel()
+    await asyncio.gather(*webhook_workers, return_exceptions=True)
+    webhook_workers.clear()
+
+@api_router.get("/admin/webhooks")
+async def get_webhook_inbox_stats(admin = Depends(get_current_admin)):
+    counts = await db.webhook_inbox.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(None)
+    failed = await db.webhook_inbox.find({"status": "failed"}).sort("received_at", -1).limit(20).to_list(20)
+    return {
+        "workers": len(webhook_workers),
+        "counts": {c["_id"]: c["count"] for c in counts},
+        "recent_failures": failed
+    }
+
+# ===================== ORDER MAINTENANCE =====================
+
+# Stripe checkout sessions live at most 24h, so an order still unpaid after that cannot be paid
+ORDER_EXPIRY_HOURS = float(os.environ.get('ORDER_EXPIRY_HOURS', '25'))
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+MAINTENANCE_INTERVAL = float(os.environ.get('MAINTENANCE_INTERVAL', '300'))
+MAINTENANCE_BATCH_SIZE = int(os.environ.get('MAINTENANCE_BATCH_SIZE', '500'))
+MAINTENANCE_LEASE_SECONDS = 120
+MAINTENANCE_LEASE_ID = "order-maintenance"
+TERMINAL_ORDER_STATUSES = ["delivered", "cancelled", "expired"]
+
+maintenance_owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+maintenance_task: Optional[asyncio.Task] = None
+maintenance_lock = asyncio.Lock()
+
+async def acquire_maintenance_lease() -> bool:
+    # also renews: the current owner may always extend its own lease
+    now = datetime.now(timezone.utc)
+    try:
+        lease = await db.scheduler_leases.find_one_and_update(
+            {"_id": MAINTENANCE_LEASE_ID, "$or": [{"lease_until": {"$lte": now}}, {"owner": maintenance_owner}]},
+            {"$set": {"owner": maintenance_owner, "lease_until": now + timedelta(seconds=MAINTENANCE_LEASE_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return False
+    return lease is not None and lease.get("owner") == maintenance_owner
+
+async def release_maintenance_lease():
+    await db.scheduler_leases.update_one(
+        {"_id": MAINTENANCE_LEASE_ID, "owner": maintenance_owner},
+        {"$set": {"lease_until": datetime.now(timezone.utc)}}
+    )
+
+async def expire_unpaid_orders(run_id: str) -> Dict[str, int]:
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=ORDER_EXPIRY_HOURS)).isoformat()
+    stale = {"status": "pending", "payment_status": {"$ne": "paid"}}
+    stats = {"expired": 0, "products_released": 0, "units_released": 0}
+    while True:
+        candidates = await db.orders.find(
+            {**stale, "created_at": {"$lt": cutoff}},
+            {"_id": 0, "id": 1, "items": 1, "stock_reserved": 1}
+        ).sort("created_at", ASCENDING).limit(MAINTENANCE_BATCH_SIZE).to_list(MAINTENANCE_BATCH_SIZE)
+        if not candidates:
+            return stats
+        ids = [order["id"] for order in candidates]
+        now = datetime.now(timezone.utc).isoformat()
+        # conditional on still being unpaid, so a payment landing mid-sweep wins
+        result = await db.orders.update_many(
+            {"id": {"$in": ids}, **stale},
+            {"$set": {"status": "expired", "stock_reserved": False, "expired_at": now,
+                      "updated_at": now, "expire_run": run_id}}
+        )
+        expired = candidates
+        if result.modified_count < len(ids):
+            marked = await db.orders.find({"id": {"$in": ids}, "expire_run": run_id}, {"_id": 0, "id": 1}).to_list(None)
+            marked_ids = {order["id"] for order in marked}
+            expired = [order for order in candidates if order["id"] in marked_ids]
+
+        quantities: Dict[str, int] = {}
+        for order in expired:
+            if order.get("stock_reserved"):
+                for product_id, quantity in item_quantities(order.get("items", [])).items():
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+        await release_stock(quantities)
+        stats["expired"] += len(expired)
+        stats["products_released"] += len(quantities)
+        stats["units_released"] += sum(quantities.values())
+        if len(candidates) < MAINTENANCE_BATCH_SIZE or not await acquire_maintenance_lease():
+            return stats
+
+async def archive_terminal_orders() -> Dict[str, int]:
+    stats = {"archived": 0}
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return stats
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)).isoformat()
+    terminal = {"status": {"$in": TERMINAL_ORDER_STATUSES}}
+    while True:
+        batch = await db.orders.find({**terminal, "created_at": {"$lt": cutoff}}) \
+            .sort("created_at", ASCENDING).limit(MAINTENANCE_BATCH_SIZE).to_list(MAINTENANCE_BATCH_SIZE)
+        if not batch:
+            return stats
+        archived_at = datetime.now(timezone.utc).isoformat()
+        try:
+            await db.orders_archive.insert_many([{**order, "archived_at": archived_at} for order in batch], ordered=False)
+        except BulkWriteError as e:
+            # copies left behind by an interrupted run are fine; anything else is not
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        ids = [order["_id"] for order in batch]
+        result = await db.orders.delete_many({"_id": {"$in": ids}, **terminal})
+        if result.deleted_count < len(ids):
+            # reopened between copy and delete: the live order stays authoritative
+            reopened = await db.orders.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)
+            await db.orders_archive.delete_many({"_id": {"$in": [order["_id"] for order in reopened]}})
+        stats["archived"] += result.deleted_count
+        if len(batch) < MAINTENANCE_BATCH_SIZE or not await acquire_maintenance_lease():
+            return stats
+
+async def run_order_maintenance() -> Optional[Dict[str, Any]]:
+    async with maintenance_lock:
+        if not await acquire_maintenance_lease():
+            return None
+        run_id = uuid.uuid4().hex
+        started = time.perf_counter()
+        run: Dict[str, Any] = {"run_id": run_id, "owner": maintenance_owner,
+                               "started_at": datetime.now(timezone.utc).isoformat()}
+        try:
+            run.update(await finish_order_effects())
+            run.update(await reap_stale_import_jobs())
+            run.update(await expire_unpaid_orders(run_id))
+            run.update(await archive_terminal_orders())
+            run["status"] = "ok"
+        except Exception as e:
+            run["status"] = "error"
+            run["error"] = str(e)
+            logger.error(f"Order maintenance failed: {e}")
+        run["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        totals = {f"totals.{key}": run.get(key, 0) for key in ("expired", "units_released", "archived")}
+        await db.scheduler_leases.update_one(
+            {"_id": MAINTENANCE_LEASE_ID},
+            {"$set": {"last_run": run}, "$inc": {**totals, "totals.runs": 1}}
+        )
+        await release_maintenance_lease()
+        return run
+
+async def maintenance_loop():
+    while True:
+        try:
+            run = await run_order_maintenance()
+            if run and (run.get("expired") or run.get("archived")):
+                logger.info(f"Order maintenance: {run.get('expired', 0)} expired, {run.get('archived', 0)} archived")
+        except Exception as e:
+            logger.error(f"Order maintenance loop error: {e}")
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+def start_order_maintenance():
+    global maintenance_task
+    if MAINTENANCE_INTERVAL > 0:
+        maintenance_task = asyncio.create_task(maintenance_loop())
+
+async def stop_order_maintenance():
+    if maintenance_task is not None:
+        maintenance_task.cancel()
+        await asyncio.gather(maintenance_task, return_exceptions=True)
+
+@api_router.get("/admin/maintenance")
+async def get_maintenance_status(admin = Depends(get_current_admin)):
+    lease = await db.scheduler_leases.find_one({"_id": MAINTENANCE_LEASE_ID}, {"_id": 0}) or {}
+    stale_unpaid = await db.orders.count_documents({
+        "status": "pending", "payment_status": {"$ne": "paid"},
+        "created_at": {"$lt": (datetime.now(timezone.utc) - timedelta(hours=ORDER_EXPIRY_HOURS)).isoformat()}
+    })
+    return {
+        "this_worker": maintenance_owner,
+        "lease_owner": lease.get("owner"),
+        "lease_until": lease.get("lease_until"),
+        "last_run": lease.get("last_run"),
+        "totals": lease.get("totals", {}),
+        "stale_unpaid_orders": stale_unpaid,
+        "archived_orders": await db.orders_archive.estimated_document_count(),
+        "config": {
+            "order_expiry_hours": ORDER_EXPIRY_HOURS,
+            "archive_after_days": ARCHIVE_AFTER_DAYS,
+            "interval_seconds": MAINTENANCE_INTERVAL,
+            "batch_size": MAINTENANCE_BATCH_SIZE,
+        },
+    }
+
+@api_router.post("/admin/maintenance/run")
+async def trigger_maintenance(admin = Depends(get_current_admin)):
+    run = await run_order_maintenance()
+    if run is None:
+        raise HTTPException(status_code=409, detail="Maintenance is running on another worker")
+    return run
+
 # ===================== CONTACT ROUTES =====================
 
 @api_router.post("/contact")
@@ -521,107 +3130,930 @@ async def create_contact(contact_data: ContactCreate):
     return {"message": "Message sent successfully"}
 
 @api_router.get("/contacts")
-async def get_contacts(admin = Depends(get_current_admin)):
-    contacts = await db.contacts.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return contacts
+async def get_contacts(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    view: str = "full",
+    admin = Depends(get_current_admin)
+):
+    projection = view_projection(CONTACT_VIEWS, view)
+    if stream:
+        return stream_ndjson(db.contacts, {}, "created_at", DESCENDING, projection)
+    if limit or cursor:
+        return json_response(await paginate(db.contacts, {}, "created_at", DESCENDING, limit, cursor, projection))
+    return await legacy_list(db.contacts, {}, projection)
 
 # ===================== SITE SETTINGS ROUTES =====================
 
+# the invalidation bus clears this on edits from any worker; the TTL is only a backstop
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '300'))
+settings_cache = TTLCache(16)
+
+async def read_site_settings(settings_type: str, model) -> Dict[str, Any]:
+    cached = settings_cache.get(settings_type)
+    if cached is not None:
+        return cached
+    settings = await db.site_settings.find_one({"type": settings_type}, {"_id": 0})
+    data = settings.get("data", model().model_dump()) if settings else model().model_dump()
+    settings_cache.put(settings_type, data, SETTINGS_CACHE_TTL)
+    return data
+
+async def write_site_settings(settings_type: str, data: Dict[str, Any]):
+    await db.site_settings.update_one(
+        {"type": settings_type},
+        {"$set": {"type": settings_type, "data": data}},
+        upsert=True
+    )
+    settings_cache.drop(settings_type)
+    catalog_cache.bump()
+    invalidation_bus.publish("settings")
+
 @api_router.get("/settings/contact")
 async def get_contact_settings():
-    settings = await db.site_settings.find_one({"type": "contact"}, {"_id": 0})
-    if not settings:
-        default = SiteSettings()
-        return default.model_dump()
-    return settings.get("data", SiteSettings().model_dump())
+    return await read_site_settings("contact", SiteSettings)
 
 @api_router.put("/settings/contact")
 async def update_contact_settings(settings: SiteSettings, admin = Depends(get_current_admin)):
-    await db.site_settings.update_one(
-        {"type": "contact"},
-        {"$set": {"type": "contact", "data": settings.model_dump()}},
-        upsert=True
-    )
+    await write_site_settings("contact", settings.model_dump())
     return {"message": "Contact settings updated"}
 
 @api_router.get("/settings/about")
 async def get_about_settings():
-    settings = await db.site_settings.find_one({"type": "about"}, {"_id": 0})
-    if not settings:
-        default = AboutContent()
-        return default.model_dump()
-    return settings.get("data", AboutContent().model_dump())
+    return await read_site_settings("about", AboutContent)
 
 @api_router.put("/settings/about")
 async def update_about_settings(content: AboutContent, admin = Depends(get_current_admin)):
-    await db.site_settings.update_one(
-        {"type": "about"},
-        {"$set": {"type": "about", "data": content.model_dump()}},
-        upsert=True
-    )
+    await write_site_settings("about", content.model_dump())
     return {"message": "About content updated"}
 
 # ===================== ANALYTICS ROUTES =====================
 
 @api_router.get("/analytics")
 async def get_analytics(admin = Depends(get_current_admin)):
-    total_products = await db.products.count_documents({})
-    total_orders = await db.orders.count_documents({})
+    total_products = await db.products.estimated_document_count()
+    total_orders = await db.orders.estimated_document_count()
     pending_orders = await db.orders.count_documents({"status": "pending"})
     confirmed_orders = await db.orders.count_documents({"status": "confirmed"})
-    
-    paid_orders = await db.orders.find({"payment_status": "paid"}, {"_id": 0}).to_list(1000)
-    total_revenue = sum(order.get("total_amount", 0) for order in paid_orders)
-    
+
+    rollup = await ensure_analytics_rollup()
+
     recent_orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
-    low_stock = await db.products.find({"quantity": {"$lte": 5}}, {"_id": 0}).to_list(100)
-    
-    category_sales = {}
-    for order in paid_orders:
-        for item in order.get("items", []):
-            product = await db.products.find_one({"id": item.get("product_id")}, {"_id": 0})
-            if product:
-                category = product.get("category", "Other")
-                category_sales[category] = category_sales.get(category, 0) + (item.get("price", 0) * item.get("quantity", 0))
-    
+    low_stock = await db.products.find({"quantity": {"$lte": 5}}, PRODUCT_PROJECTION).to_list(100)
+
     return {
         "total_products": total_products,
         "total_orders": total_orders,
         "pending_orders": pending_orders,
         "confirmed_orders": confirmed_orders,
-        "total_revenue": total_revenue,
+        "total_revenue": rollup["total_revenue"],
         "recent_orders": recent_orders,
         "low_stock_products": low_stock,
-        "category_sales": category_sales
+        "category_sales": rollup["category_sales"]
+    }
+
+@api_router.post("/analytics/rebuild")
+async def rebuild_analytics(admin = Depends(get_current_admin)):
+    return await rebuild_analytics_rollup()
+
+@api_router.get("/analytics/sales")
+async def get_sales_series(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    top: int = Query(10, ge=1, le=100),
+    admin = Depends(get_current_admin)
+):
+    try:
+        end_ts = parse_timestamp(end) if end else datetime.now(timezone.utc)
+        start_ts = parse_timestamp(start) if start else end_ts - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if start_ts > end_ts:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+
+    start_key = bucket_start(start_ts, granularity).isoformat()
+    end_key = bucket_start(end_ts, granularity).isoformat()
+    buckets = await db.sales_buckets.find(
+        {"granularity": granularity, "bucket": {"$gte": start_key, "$lte": end_key}}, {"_id": 0, "applied": 0}
+    ).to_list(None)
+    by_bucket = {b["bucket"]: b for b in buckets}
+    series = [
+        {
+            "bucket": point,
+            "revenue": by_bucket.get(point, {}).get("revenue", 0),
+            "orders": by_bucket.get(point, {}).get("orders", 0),
+            "units": by_bucket.get(point, {}).get("units", 0),
+        }
+        for point in series_points(start_ts, end_ts, granularity)
+    ]
+    return {
+        "granularity": granularity,
+        "start": start_key,
+        "end": end_key,
+        "series": series,
+        "totals": {
+            "revenue": sum(b.get("revenue", 0) for b in buckets),
+            "orders": sum(b.get("orders", 0) for b in buckets),
+            "units": sum(b.get("units", 0) for b in buckets),
+        },
+        "top_products": await top_bucket_items("product", granularity, start_key, end_key, top),
+        "top_categories": await top_bucket_items("category", granularity, start_key, end_key, top),
+    }
+
+@api_router.post("/analytics/sales/backfill")
+async def backfill_sales(batch_size: int = Query(BACKFILL_BATCH_SIZE, ge=100, le=10000), admin = Depends(get_current_admin)):
+    return await backfill_sales_buckets(batch_size)
+
+# ===================== EXPORTS =====================
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+# spreadsheet apps evaluate cells starting with these; customer-entered text must not become a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# phone numbers and signed amounts start with +/- but cannot be formulas
+SIGNED_NUMBER_RE = re.compile(r"^[+-][\d\s().-]*$")
+
+def order_items_summary(order: Dict[str, Any]) -> str:
+    return "; ".join(f"{item.get('name', '')} x{item.get('quantity', 0)}" for item in order.get("items", []))
+
+# kind -> collection, keyset sort field, filters it accepts, (header, field or callable) columns
+EXPORT_SPECS: Dict[str, Dict[str, Any]] = {
+    "orders": {
+        "collection": "orders",
+        "sort": "created_at",
+        "filters": {"status", "payment_status"},
+        "columns": [
+            ("id", "id"), ("created_at", "created_at"), ("status", "status"),
+            ("payment_status", "payment_status"), ("paid_at", "paid_at"),
+            ("customer_name", "customer_name"), ("customer_email", "customer_email"),
+            ("customer_phone", "customer_phone"), ("customer_address", "customer_address"),
+            ("items_count", lambda o: sum(i.get("quantity", 0) for i in o.get("items", []))),
+            ("items", order_items_summary), ("total_amount", "total_amount"),
+        ],
+    },
+    "products": {
+        "collection": "products",
+        "sort": "sort_order",
+        "filters": {"category"},
+        # same headers the Excel import reads, so an export can be edited and re-imported
+        "columns": [
+            ("sku", "sku"), ("name", "name"), ("description", "description"), ("category", "category"),
+            ("price", "price"), ("quantity", "quantity"), ("image_url", "image_url"),
+            ("id", "id"), ("created_at", "created_at"), ("updated_at", "updated_at"),
+        ],
+    },
+    "contacts": {
+        "collection": "contacts",
+        "sort": "created_at",
+        "filters": set(),
+        "columns": [
+            ("id", "id"), ("created_at", "created_at"), ("name", "name"),
+            ("email", "email"), ("phone", "phone"), ("message", "message"),
+        ],
+    },
+}
+
+def export_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not SIGNED_NUMBER_RE.match(value):
+        return "'" + value
+    return value
+
+def export_row(columns: List[tuple], doc: Dict[str, Any]) -> List[Any]:
+    return [export_cell(field(doc) if callable(field) else doc.get(field)) for _, field in columns]
+
+def export_date_bound(value: str, end: bool) -> str:
+    try:
+        ts = parse_timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    # a bare end date means "through that day"
+    if end and len(value) == 10:
+        ts += timedelta(days=1)
+    return ts.astimezone(timezone.utc).isoformat()
+
+async def export_batches(spec: Dict[str, Any], query: Dict[str, Any]):
+    projection = {"_id": 0, "stock_holds": 0}
+    cursor = db[spec["collection"]].find(query, projection) \
+        .sort([(spec["sort"], ASCENDING), ("id", ASCENDING)]) \
+        .batch_size(EXPORT_BATCH_SIZE)
+    batch: List[List[Any]] = []
+    async for doc in cursor:
+        batch.append(export_row(spec["columns"], doc))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def csv_chunk(rows: List[List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+async def stream_csv(spec: Dict[str, Any], query: Dict[str, Any]):
+    # BOM so Excel opens UTF-8 (Cyrillic/Uzbek names) correctly
+    yield "\ufeff".encode("utf-8") + csv_chunk([[header for header, _ in spec["columns"]]])
+    async for batch in export_batches(spec, query):
+        yield csv_chunk(batch)
+
+async def stream_xlsx(spec: Dict[str, Any], query: Dict[str, Any], sheet_name: str):
+    from openpyxl import Workbook
+
+    # write-only sheets spill rows to a temp file, so memory stays flat; the zip is only
+    # assembled on save, after which the finished file is streamed back in chunks
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append([header for header, _ in spec["columns"]])
+
+    def append_rows(rows: List[List[Any]]):
+        for row in rows:
+            sheet.append(row)
+
+    async for batch in export_batches(spec, query):
+        await asyncio.to_thread(append_rows, batch)
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
+    tmp.close()
+    try:
+        await asyncio.to_thread(workbook.save, tmp.name)
+        async with await anyio.open_file(tmp.name, "rb") as f:
+            while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.unlink(tmp.name)
+
+@api_router.get("/admin/export/{kind}")
+async def export_collection(
+    kind: str,
+    file_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    category: Optional[str] = None,
+    admin = Depends(get_current_admin)
+):
+    spec = EXPORT_SPECS.get(kind)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{kind}'")
+
+    filters = {"status": status, "payment_status": payment_status, "category": category}
+    query: Dict[str, Any] = {}
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in spec["filters"]:
+            raise HTTPException(status_code=400, detail=f"'{name}' filter is not supported for {kind}")
+        query[name] = value
+    created: Dict[str, str] = {}
+    if start:
+        created["$gte"] = export_date_bound(start, end=False)
+    if end:
+        created["$lt"] = export_date_bound(end, end=True)
+    if created:
+        query["created_at"] = created
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    headers = {"Content-Disposition": f'attachment; filename="{kind}-{stamp}.{file_format}"', "Cache-Control": "no-store"}
+    if file_format == "xlsx":
+        return StreamingResponse(
+            stream_xlsx(spec, query, kind),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers,
+        )
+    return StreamingResponse(stream_csv(spec, query), media_type="text/csv; charset=utf-8", headers=headers)
+
+# ===================== INDEXES =====================
+
+# (collection, keys, options) for every index the routes above rely on
+INDEX_SPECS = [
+    ("products", [("id", ASCENDING)], {"unique": True}),
+    ("products", [("category", ASCENDING), ("sort_order", ASCENDING), ("id", ASCENDING)], {}),
+    ("products", [("sort_order", ASCENDING), ("id", ASCENDING)], {}),
+    ("products", [("quantity", ASCENDING)], {}),
+    ("products", [("sku", ASCENDING)], {"unique": True, "partialFilterExpression": {"sku": {"$gt": ""}}}),
+    ("orders", [("id", ASCENDING)], {"unique": True}),
+    ("orders", [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("orders", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("orders", [("payment_status", ASCENDING)], {}),
+    ("orders", [("payment_session_id", ASCENDING)], {}),
+    ("orders", [("effects_pending", ASCENDING)], {}),
+    ("orders_archive", [("id", ASCENDING)], {"unique": True}),
+    ("orders_archive", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("payment_transactions", [("session_id", ASCENDING)], {"unique": True}),
+    ("admins", [("email", ASCENDING)], {"unique": True}),
+    ("site_settings", [("type", ASCENDING)], {"unique": True}),
+    ("contacts", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("import_jobs", [("id", ASCENDING)], {"unique": True}),
+    ("webhook_inbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)], {}),
+    ("revoked_tokens", [("jti", ASCENDING)], {"unique": True}),
+    ("revoked_tokens", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ("sales_buckets", [("granularity", ASCENDING), ("bucket", ASCENDING)], {}),
+    ("sales_bucket_items", [("granularity", ASCENDING), ("kind", ASCENDING), ("bucket", ASCENDING)], {}),
+]
+
+# Representative query shape of each hot route, checked with explain()
+ROUTE_QUERIES = [
+    ("GET /products", "products", {}, [("sort_order", 1)]),
+    ("GET /products?category", "products", {"category": ""}, [("sort_order", 1)]),
+    ("GET /products/{id}", "products", {"id": ""}, None),
+    ("GET /orders", "orders", {}, [("created_at", -1)]),
+    ("GET /orders?status", "orders", {"status": ""}, [("created_at", -1)]),
+    ("GET /orders/{id}", "orders", {"id": ""}, None),
+    ("GET /payments/status", "orders", {"payment_session_id": ""}, None),
+    ("GET /payments/status", "payment_transactions", {"session_id": ""}, None),
+    ("POST /auth/login", "admins", {"email": ""}, None),
+    ("GET /settings", "site_settings", {"type": ""}, None),
+    ("GET /contacts", "contacts", {}, [("created_at", -1)]),
+    ("GET /analytics", "orders", {"payment_status": "paid"}, None),
+    ("GET /analytics", "products", {"quantity": {"$lte": 5}}, None),
+]
+
+index_report: Dict[str, Any] = {"created": [], "existing": [], "conflicts": [], "checked_at": None}
+
+def index_name(keys) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+async def find_duplicates(collection: str, keys) -> List[Dict[str, Any]]:
+    group_id = {field: f"${field}" for field, _ in keys}
+    pipeline = [
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 20},
+    ]
+    return await db[collection].aggregate(pipeline).to_list(20)
+
+async def ensure_indexes() -> Dict[str, Any]:
+    report = {"created": [], "existing": [], "conflicts": [], "checked_at": None}
+    existing_by_collection: Dict[str, Dict[str, Any]] = {}
+    for collection, keys, options in INDEX_SPECS:
+        if collection not in existing_by_collection:
+            existing_by_collection[collection] = await db[collection].index_information()
+        name = index_name(keys)
+        if name in existing_by_collection[collection]:
+            report["existing"].append(f"{collection}.{name}")
+            continue
+        try:
+            await db[collection].create_index(keys, name=name, **options)
+            report["created"].append(f"{collection}.{name}")
+        except DuplicateKeyError:
+            duplicates = await find_duplicates(collection, keys)
+            report["conflicts"].append({"collection": collection, "index": name, "duplicates": duplicates})
+            logger.error(f"Unique index {collection}.{name} not created: {len(duplicates)} duplicate keys")
+        except OperationFailure as e:
+            report["conflicts"].append({"collection": collection, "index": name, "error": str(e)})
+            logger.error(f"Index {collection}.{name} not created: {e}")
+    report["checked_at"] = datetime.now(timezone.utc).isoformat()
+    index_report.update(report)
+    return report
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages.extend(plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+async def explain_route_queries() -> List[Dict[str, Any]]:
+    results = []
+    for route, collection, query, sort in ROUTE_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = plan_stages(winning_plan)
+        results.append({
+            "route": route,
+            "collection": collection,
+            "query": list(query.keys()),
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+        })
+    return results
+
+@api_router.get("/admin/indexes")
+async def get_index_status(admin = Depends(get_current_admin)):
+    usage = {}
+    for collection in sorted({spec[0] for spec in INDEX_SPECS}):
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(100)
+        usage[collection] = [
+            {"name": s["name"], "ops": s.get("accesses", {}).get("ops", 0), "since": s.get("accesses", {}).get("since")}
+            for s in stats
+        ]
+    routes = await explain_route_queries()
+    return {
+        "report": index_report,
+        "usage": usage,
+        "routes": routes,
+        "unindexed_routes": sorted({r["route"] for r in routes if r["collection_scan"]}),
     }
 
+@api_router.post("/admin/indexes/sync")
+async def sync_indexes(admin = Depends(get_current_admin)):
+    return await ensure_indexes()
+
+# ===================== RATE LIMITING =====================
+
+# unauthenticated writes: each one hits MongoDB or Stripe, so bursts are cut off before the handler runs
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# proxies in front of the app that append to X-Forwarded-For; 0 trusts only the socket peer.
+# "auto" (default) trusts the last hop when the socket peer is a private or loopback address,
+# i.e. an ingress; keying buckets on the ingress IP would put every shopper in one bucket
+TRUSTED_PROXY_HOPS = os.environ.get('TRUSTED_PROXY_HOPS', 'auto')
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))
+GLOBAL_WRITE_RATE = float(os.environ.get('GLOBAL_WRITE_RATE', '50'))
+GLOBAL_WRITE_BURST = float(os.environ.get('GLOBAL_WRITE_BURST', '100'))
+SHED_POOL_UTILIZATION = float(os.environ.get('SHED_POOL_UTILIZATION', '0.9'))
+SHED_MONGO_LATENCY_MS = float(os.environ.get('SHED_MONGO_LATENCY_MS', '500'))
+SHED_RETRY_AFTER = int(os.environ.get('SHED_RETRY_AFTER', '2'))
+# p90 of storefront-path command latency over this window; rejected writes issue no
+# commands, so old samples age out and shedding lifts without needing fast requests
+SHED_LATENCY_WINDOW = 10.0
+
+REJECTION_DETAILS = {
+    "overloaded": "Server is busy, please retry shortly",
+    "concurrency": "Too many requests in progress, please retry shortly",
+    "client_rate": "Too many requests, please slow down",
+    "global_rate": "Server is busy, please retry shortly",
+}
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        # 0 when a token was taken, otherwise seconds until the next one
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class RouteLimit:
+    def __init__(self, name: str, rate: float, burst: float, concurrency: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def bucket(self, ip: str) -> TokenBucket:
+        bucket = self.clients.get(ip)
+        if bucket is None:
+            bucket = self.clients[ip] = TokenBucket(self.rate, self.burst)
+            while len(self.clients) > RATE_LIMIT_MAX_CLIENTS:
+                self.clients.popitem(last=False)
+        else:
+            self.clients.move_to_end(ip)
+        return bucket
+
+def route_limit(name: str, default: str) -> RouteLimit:
+    # RATE_LIMIT_<NAME>="per-IP tokens/second,per-IP burst,max concurrent requests"
+    rate, burst, concurrency = os.environ.get(f'RATE_LIMIT_{name.upper()}', default).split(",")
+    return RouteLimit(name, float(rate), float(burst), int(concurrency))
+
+ROUTE_LIMITS = {
+    ("POST", "/api/orders"): route_limit("orders", "0.2,10,32"),
+    ("POST", "/api/contact"): route_limit("contact", "0.05,5,8"),
+    ("POST", "/api/payments/checkout"): route_limit("checkout", "0.2,10,16"),
+}
+
+def is_internal_address(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return ip.is_private or ip.is_loopback
+
+def trusted_proxy_hops(peer: Optional[str]) -> int:
+    if TRUSTED_PROXY_HOPS == "auto":
+        return 1 if peer and is_internal_address(peer) else 0
+    return int(TRUSTED_PROXY_HOPS)
+
+def client_ip(scope) -> str:
+    peer = scope.get("client")
+    peer = peer[0] if peer else None
+    trusted = trusted_proxy_hops(peer)
+    if trusted:
+        forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[max(len(hops) - trusted, 0)]
+    return peer or "unknown"
+
+class RateLimiter:
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_WRITE_RATE, GLOBAL_WRITE_BURST)
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[tuple, int] = {}
+
+    def overload_reason(self) -> Optional[str]:
+        max_pool_size = client.options.pool_options.max_pool_size
+        if max_pool_size and mongo_load.busiest_pool() >= max_pool_size * SHED_POOL_UTILIZATION:
+            return "pool"
+        if mongo_load.recent_latency(SHED_LATENCY_WINDOW) * 1000 >= SHED_MONGO_LATENCY_MS:
+            return "latency"
+        return None
+
+    def check(self, limit: RouteLimit, ip: str) -> Optional[tuple]:
+        # cheapest and most protective checks first; a rejected client never spends global tokens
+        rejection = None
+        if self.overload_reason():
+            rejection = (503, SHED_RETRY_AFTER, "overloaded")
+        elif limit.in_flight >= limit.concurrency:
+            rejection = (503, 1, "concurrency")
+        else:
+            now = time.monotonic()
+            client_bucket = limit.bucket(ip)
+            wait = client_bucket.take(now)
+            if wait:
+                rejection = (429, math.ceil(wait), "client_rate")
+            else:
+                wait = self.global_bucket.take(now)
+                if wait:
+                    client_bucket.refund()
+                    rejection = (429, math.ceil(wait), "global_rate")
+        if rejection is None:
+            self.allowed[limit.name] = self.allowed.get(limit.name, 0) + 1
+        else:
+            key = (limit.name, rejection[2])
+            self.rejected[key] = self.rejected.get(key, 0) + 1
+        return rejection
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "global": {"rate": GLOBAL_WRITE_RATE, "burst": GLOBAL_WRITE_BURST,
+                       "tokens": round(self.global_bucket.tokens, 2)},
+            "routes": {
+                limit.name: {
+                    "rate": limit.rate,
+                    "burst": limit.burst,
+                    "concurrency": limit.concurrency,
+                    "in_flight": limit.in_flight,
+                    "tracked_clients": len(limit.clients),
+                    "allowed": self.allowed.get(limit.name, 0),
+                    "rejected": {reason: count for (name, reason), count in self.rejected.items() if name == limit.name},
+                }
+                for limit in ROUTE_LIMITS.values()
+            },
+            "mongo": {
+                "busiest_pool_checked_out": mongo_load.busiest_pool(),
+                "max_pool_size": client.options.pool_options.max_pool_size,
+                "waiting_for_connection": mongo_load.waiting,
+                "latency_p90_ms": round(mongo_load.recent_latency(SHED_LATENCY_WINDOW) * 1000, 2),
+                "overload": self.overload_reason(),
+            },
+        }
+
+rate_limiter = RateLimiter()
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and RATE_LIMIT_ENABLED:
+            limit = ROUTE_LIMITS.get((scope["method"], scope["path"].rstrip("/")))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        rejection = rate_limiter.check(limit, client_ip(scope))
+        if rejection is not None:
+            status, retry_after, reason = rejection
+            response = ORJSONResponse(
+                status_code=status,
+                content={"detail": REJECTION_DETAILS[reason]},
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        queries = current_request_queries.get()
+        if queries is not None:
+            queries.load_signal = True
+        limit.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.in_flight -= 1
+
+@api_router.get("/admin/rate-limits")
+async def get_rate_limits(admin = Depends(get_current_admin)):
+    return rate_limiter.stats()
+
 # ===================== ROOT & HEALTH =====================
 
+HEALTH_PING_TIMEOUT = float(os.environ.get('HEALTH_PING_TIMEOUT', '2'))
+
 @api_router.get("/")
 async def root():
     return {"message": "REKLAMA SAVDO API", "status": "running"}
 
 @api_router.get("/health")
 async def health():
-    return {"status": "healthy"}
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), HEALTH_PING_TIMEOUT)
+    except Exception as e:
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        return ORJSONResponse(status_code=503, content={
+            "status": "unhealthy",
+            "database": {"status": "error", "error": str(e) or type(e).__name__, "latency_ms": latency_ms},
+        })
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    return {"status": "healthy", "database": {"status": "ok", "latency_ms": latency_ms}}
+
+# ===================== STARTUP PROFILE =====================
+
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', '5'))
+
+class StartupProfile:
+    def __init__(self):
+        self.import_seconds: Optional[float] = None
+        self.startup_began: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.first_request_seconds: Optional[float] = None
+
+    def module_imported(self):
+        self.import_seconds = round(time.perf_counter() - SERVER_IMPORT_STARTED, 4)
+
+    def startup_started(self):
+        self.startup_began = time.perf_counter()
+
+    def startup_finished(self):
+        now = time.perf_counter()
+        self.startup_seconds = round(now - (self.startup_began or now), 4)
+        self.ready_seconds = round(now - SERVER_IMPORT_STARTED, 4)
+
+    def request_finished(self):
+        if self.first_request_seconds is None:
+            self.first_request_seconds = round(time.perf_counter() - SERVER_IMPORT_STARTED, 4)
+
+    def report(self) -> Dict[str, Any]:
+        # ru_maxrss is reported in kilobytes on Linux
+        max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return {
+            "import_seconds": self.import_seconds,
+            "startup_hooks_seconds": self.startup_seconds,
+            "ready_seconds": self.ready_seconds,
+            "first_request_seconds": self.first_request_seconds,
+            "budget_seconds": STARTUP_BUDGET_SECONDS,
+            "within_budget": self.ready_seconds is not None and self.ready_seconds <= STARTUP_BUDGET_SECONDS,
+            "lazy_imports": {
+                name: {"loaded": name in lazy_import_seconds, "seconds": lazy_import_seconds.get(name)}
+                for name in LAZY_MODULES
+            },
+            "warm_imports": WARM_IMPORTS,
+            "max_rss_mb": max_rss_mb,
+        }
+
+startup_profile = StartupProfile()
+
+@api_router.get("/admin/startup")
+async def get_startup_profile(admin = Depends(get_current_admin)):
+    return startup_profile.report()
+
+# ===================== METRICS ROUTES =====================
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '500'))
+
+def route_label(scope) -> str:
+    # templated paths keep label cardinality bounded
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if isinstance(scope.get("endpoint"), StaticFiles):
+        return scope.get("root_path") or "static"
+    return "unmatched"
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        queries = RequestQueries()
+        token = current_request_queries.set(queries)
+        started = time.perf_counter()
+        metrics.in_flight += 1
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - started
+            metrics.in_flight -= 1
+            current_request_queries.reset(token)
+            startup_profile.request_finished()
+            route = route_label(scope)
+            metrics.observe_request(scope["method"], route, status, seconds, queries)
+            if seconds * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(
+                    f"Slow request {scope['method']} {route} -> {status} in {seconds * 1000:.0f}ms, "
+                    f"{queries.round_trips} db round trips: {'; '.join(queries.breakdown()) or 'none'}"
+                )
+
+def prometheus_labels(names: tuple, values: tuple) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+def render_histogram(lines: List[str], name: str, help_text: str, label_names: tuple, series: Dict[Any, Histogram]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(series.items()):
+        values = key if isinstance(key, tuple) else (key,)
+        labels = prometheus_labels(label_names, values)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+def render_counter(lines: List[str], name: str, help_text: str, label_names: tuple, series: Dict[Any, int], kind: str = "counter"):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for key, value in sorted(series.items()):
+        values = key if isinstance(key, tuple) else (key,)
+        labels = prometheus_labels(label_names, values)
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    with metrics.lock:
+        render_counter(lines, "http_requests_in_flight", "Requests currently being served.", (), {(): metrics.in_flight}, "gauge")
+        render_counter(lines, "http_requests_total", "Requests by method, route and status.",
+                       ("method", "route", "status"), metrics.requests)
+        render_histogram(lines, "http_request_duration_seconds", "Request latency by route.",
+                         ("method", "route"), metrics.request_latency)
+        render_histogram(lines, "http_request_db_round_trips", "MongoDB commands issued per request.",
+                         ("route",), metrics.request_round_trips)
+        render_histogram(lines, "mongodb_command_duration_seconds", "MongoDB command latency.",
+                         ("collection", "command"), metrics.mongo_latency)
+        render_counter(lines, "mongodb_command_failures_total", "Failed MongoDB commands.",
+                       ("collection", "command"), metrics.mongo_failures)
+    catalog = catalog_cache.stats()
+    render_counter(lines, "catalog_cache_lookups_total", "Catalog cache lookups by result.", ("result",),
+                   {("hit",): catalog["hits"], ("miss",): catalog["misses"], ("not_modified",): catalog["not_modified"]})
+    render_counter(lines, "response_compression_bytes_total", "Bytes before and after response compression.", ("stage",),
+                   {("in",): compression_stats["bytes_in"], ("out",): compression_stats["bytes_out"]})
+    render_counter(lines, "uploads_bytes_sent_total", "Bytes served from /uploads.", (), {(): uploads_stats["bytes_sent"]})
+    render_counter(lines, "rate_limit_allowed_total", "Rate-limited requests let through, by route group.", ("group",),
+                   {(name,): count for name, count in rate_limiter.allowed.items()})
+    render_counter(lines, "rate_limit_rejections_total", "Requests rejected by the rate limiter or load shedding.",
+                   ("group", "reason"), rate_limiter.rejected)
+    render_counter(lines, "mongodb_pool_checked_out", "Connections checked out of the busiest MongoDB pool.", (),
+                   {(): mongo_load.busiest_pool()}, "gauge")
+    return "\n".join(lines) + "\n"
+
+# scraped directly on the pod; not routed under /api
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Include router
 app.include_router(api_router)
 
+# innermost, so rejections still get CORS headers and show up in request metrics
+app.add_middleware(RateLimitMiddleware)
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # the storefront reads ETags to revalidate its cached bootstrap payload;
+    # X-Truncated marks an unpaginated admin list that hit LEGACY_LIST_LIMIT
+    expose_headers=["ETag", "X-Truncated"],
 )
 
+# outermost, so recorded latency covers CORS and compression too
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_profile_begin():
+    startup_profile.startup_started()
+
+@app.on_event("startup")
+async def startup_indexes():
+    try:
+        report = await ensure_indexes()
+        logger.info(f"Indexes: {len(report['created'])} created, {len(report['existing'])} existing, {len(report['conflicts'])} conflicts")
+    except Exception as e:
+        logger.error(f"Index check failed: {e}")
+
+@app.on_event("startup")
+async def startup_analytics_rollup():
+    # built eagerly so payments landing before the first dashboard visit cannot stand in for history
+    async def build():
+        try:
+            await ensure_analytics_rollup()
+        except HTTPException:
+            # another worker holds the rebuild lease and is building it
+            pass
+        except Exception as e:
+            logger.error(f"Analytics rollup build failed: {e}")
+
+    spawn_background(build())
+
+@app.on_event("startup")
+async def startup_search_index():
+    count = await rebuild_search_index()
+    logger.info(f"Search index built for {count} products")
+
+@app.on_event("startup")
+async def startup_import_jobs():
+    # jobs a previous process left queued or running would otherwise be polled forever
+    async def reap():
+        try:
+            await reap_stale_import_jobs()
+        except Exception as e:
+            logger.error(f"Import job cleanup failed: {e}")
+
+    spawn_background(reap())
+
+@app.on_event("startup")
+async def startup_webhook_workers():
+    start_webhook_workers()
+
+@app.on_event("startup")
+async def startup_order_maintenance():
+    start_order_maintenance()
+
+@app.on_event("startup")
+async def startup_invalidation_bus():
+    try:
+        await invalidation_bus.start()
+        logger.info(f"Cache invalidation mode: {invalidation_bus.mode}")
+    except Exception as e:
+        logger.error(f"Cache invalidation bus failed to start: {e}")
+
+@app.on_event("startup")
+async def startup_profile_end():
+    # registered last so it runs after every other startup hook
+    startup_profile.startup_finished()
+    report = startup_profile.report()
+    logger.info(
+        f"Startup: imports {report['import_seconds']}s, hooks {report['startup_hooks_seconds']}s, "
+        f"ready after {report['ready_seconds']}s, max RSS {report['max_rss_mb']}MB"
+    )
+    if not report["within_budget"]:
+        logger.warning(f"Cold start took {report['ready_seconds']}s, over the {STARTUP_BUDGET_SECONDS}s budget")
+    if WARM_IMPORTS:
+        # after readiness so warming never delays the first request
+        spawn_background(asyncio.to_thread(warm_dependencies, WARM_IMPORTS))
+
+@app.on_event("shutdown")
+async def shutdown_webhook_workers():
+    await stop_webhook_workers()
+
+@app.on_event("shutdown")
+async def shutdown_order_maintenance():
+    await stop_order_maintenance()
+
+@app.on_event("shutdown")
+async def shutdown_invalidation_bus():
+    await invalidation_bus.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    password_executor.shutdown(wait=False)
+    if image_executor is not None:
+        image_executor.shutdown(wait=False)
+
+startup_profile.module_imported()
@@ -4,8 +4,14 @@ import { useCart } from '../context/CartContext';
 import { Button } from './ui/button';
 import { toast } from 'sonner';
 
+// Uploaded images are stored as /uploads/<sha256>.<ext> with resized variants beside them;
+// SVGs are kept as uploaded and have none
+const HASHED_UPLOAD = /^(.*\/uploads\/[0-9a-f]{64})\.(?!svg$)\w+$/;
+
 export default function ProductCard({ product }) {
   const { addToCart } = useCart();
+  const variantMatch = product.image_url && product.image_url.match(HASHED_UPLOAD);
+  const variantBase = variantMatch ? variantMatch[1] : null;
 
   const handleAddToCart = (e) => {
     e.preventDefault();
@@ -25,11 +31,21 @@ export default function ProductCard({ product }) {
       <Link to={`/products/${product.id}`}>
         <div className="relative aspect-[4/3] overflow-hidden bg-[#0A1B30]">
           {product.image_url ? (
-            <img
-              src={product.image_url}
-              alt={product.name}
-              className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
-            />
+            <picture>
+              {variantBase && (
+                <source
+                  type="image/webp"
+                  srcSet={`${variantBase}-thumb.webp 200w, ${variantBase}-card.webp 480w, ${variantBase}-detail.webp 1200w`}
+                  sizes="(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 100vw"
+                />
+              )}
+              <img
+                src={variantBase ? `${variantBase}-card.jpg` : product.image_url}
+                alt={product.name}
+                loading="lazy"
+                className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
+              />
+            </picture>
           ) : (
             <div className="w-full h-full flex items-center justify-center">
               <span className="text-[#7BA4D0] text-4xl font-heading font-bold opacity-20">
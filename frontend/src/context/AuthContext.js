@@ -42,6 +42,12 @@ export function AuthProvider({ children }) {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('admin_token');
+    if (token) {
+      axios.post(`${API}/auth/logout`, null, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {});
+    }
     localStorage.removeItem('admin_token');
     setAdmin(null);
   };
@@ -1,6 +1,8 @@
 import { createContext, useContext, useState, useEffect } from 'react';
+import axios from 'axios';
 
 const CartContext = createContext();
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 export function CartProvider({ children }) {
   const [cart, setCart] = useState(() => {
@@ -46,6 +48,38 @@ export function CartProvider({ children }) {
     setCart([]);
   };
 
+  // Refreshes price and stock for every line in one request and returns what changed
+  const revalidateCart = async () => {
+    if (cart.length === 0) return [];
+    const response = await axios.get(`${API}/products/lookup`, {
+      params: { ids: cart.map(item => item.id).join(',') }
+    });
+    const current = Object.fromEntries(response.data.products.map(product => [product.id, product]));
+    const changes = [];
+    const next = [];
+    cart.forEach(item => {
+      const product = current[item.id];
+      if (!product || !product.available) {
+        changes.push(`${item.name} is no longer available`);
+        return;
+      }
+      let updated = item;
+      if (product.price !== item.price) {
+        changes.push(`${item.name} now costs $${product.price.toFixed(2)}`);
+        updated = { ...updated, price: product.price };
+      }
+      if (product.quantity < item.quantity) {
+        changes.push(`Only ${product.quantity} of ${item.name} left in stock`);
+        updated = { ...updated, quantity: product.quantity };
+      }
+      next.push(updated);
+    });
+    if (changes.length > 0) {
+      setCart(next);
+    }
+    return changes;
+  };
+
   const cartTotal = cart.reduce((sum, item) => sum + item.price * item.quantity, 0);
   const cartCount = cart.reduce((sum, item) => sum + item.quantity, 0);
 
@@ -56,6 +90,7 @@ export function CartProvider({ children }) {
       removeFromCart,
       updateQuantity,
       clearCart,
+      revalidateCart,
       cartTotal,
       cartCount
     }}>
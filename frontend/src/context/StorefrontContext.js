@@ -0,0 +1,58 @@
+import { createContext, useContext, useState, useEffect } from 'react';
+import axios from 'axios';
+
+const StorefrontContext = createContext();
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const STORAGE_KEY = 'reklama_bootstrap';
+
+function readSaved() {
+  try {
+    return JSON.parse(localStorage.getItem(STORAGE_KEY));
+  } catch (error) {
+    return null;
+  }
+}
+
+export function StorefrontProvider({ children }) {
+  const [bootstrap, setBootstrap] = useState(() => readSaved()?.data || null);
+  const [loading, setLoading] = useState(!bootstrap);
+
+  useEffect(() => {
+    fetchBootstrap();
+  }, []);
+
+  const fetchBootstrap = async () => {
+    const saved = readSaved();
+    try {
+      // The ETag is the payload version; a 304 means the saved copy is still current
+      const response = await axios.get(`${API}/storefront/bootstrap`, {
+        headers: saved?.etag ? { 'If-None-Match': saved.etag } : {},
+        validateStatus: (status) => status === 200 || status === 304,
+      });
+      if (response.status === 200) {
+        setBootstrap(response.data);
+        localStorage.setItem(STORAGE_KEY, JSON.stringify({ etag: response.headers.etag, data: response.data }));
+      }
+    } catch (error) {
+      console.error('Error fetching storefront data:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <StorefrontContext.Provider value={{
+      loading,
+      settings: bootstrap?.settings || {},
+      categories: bootstrap?.categories || [],
+      featured: bootstrap?.featured || [],
+      refresh: fetchBootstrap
+    }}>
+      {children}
+    </StorefrontContext.Provider>
+  );
+}
+
+export function useStorefront() {
+  return useContext(StorefrontContext);
+}
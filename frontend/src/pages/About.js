@@ -1,9 +1,7 @@
 import { useState, useEffect } from 'react';
-import axios from 'axios';
 import { Users, Target, Award, Lightbulb } from 'lucide-react';
 import { useLanguage } from '../context/LanguageContext';
-
-const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+import { useStorefront } from '../context/StorefrontContext';
 
 const defaultValues = [
   { icon: 'Target', title: 'Quality First', description: 'We use only premium materials to ensure your advertising stands out.' },
@@ -16,6 +14,7 @@ const iconMap = { Target, Users, Award, Lightbulb };
 
 export default function About() {
   const { t } = useLanguage();
+  const { settings } = useStorefront();
   const [aboutContent, setAboutContent] = useState({
     hero_title: 'REKLAMA SAVDO',
     hero_subtitle: 'We are a leading provider of advertising signage and digital printing materials.',
@@ -27,23 +26,15 @@ export default function About() {
   });
 
   useEffect(() => {
-    fetchAboutContent();
-  }, []);
-
-  const fetchAboutContent = async () => {
-    try {
-      const response = await axios.get(`${API}/settings/about`);
-      if (response.data) {
-        setAboutContent(prev => ({
-          ...prev,
-          ...response.data,
-          values: response.data.values?.length > 0 ? response.data.values : defaultValues
-        }));
-      }
-    } catch (error) {
-      console.error('Error fetching about content:', error);
+    const about = settings.about;
+    if (about) {
+      setAboutContent(prev => ({
+        ...prev,
+        ...about,
+        values: about.values?.length > 0 ? about.values : defaultValues
+      }));
     }
-  };
+  }, [settings.about]);
 
   const getIcon = (iconName) => {
     const IconComponent = iconMap[iconName] || Target;
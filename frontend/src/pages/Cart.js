@@ -1,10 +1,18 @@
+import { useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { Trash2, Minus, Plus, ShoppingBag, ArrowRight } from 'lucide-react';
 import { useCart } from '../context/CartContext';
 import { Button } from '../components/ui/button';
+import { toast } from 'sonner';
 
 export default function Cart() {
-  const { cart, updateQuantity, removeFromCart, cartTotal, cartCount } = useCart();
+  const { cart, updateQuantity, removeFromCart, revalidateCart, cartTotal, cartCount } = useCart();
+
+  useEffect(() => {
+    revalidateCart()
+      .then(changes => changes.forEach(change => toast.info(change)))
+      .catch(error => console.error('Error refreshing cart:', error));
+  }, []);
 
   if (cart.length === 0) {
     return (
@@ -12,7 +12,7 @@ const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 export default function Checkout() {
   const navigate = useNavigate();
-  const { cart, cartTotal, clearCart } = useCart();
+  const { cart, cartTotal, clearCart, revalidateCart } = useCart();
   const [loading, setLoading] = useState(false);
   const [formData, setFormData] = useState({
     name: '',
@@ -32,6 +32,14 @@ export default function Checkout() {
     setLoading(true);
 
     try {
+      // Prices or stock may have moved since the cart was filled
+      const changes = await revalidateCart();
+      if (changes.length > 0) {
+        changes.forEach(change => toast.warning(change));
+        setLoading(false);
+        return;
+      }
+
       // Create order
       const orderData = {
         items: cart.map(item => ({
@@ -59,7 +67,7 @@ export default function Checkout() {
       window.location.href = checkoutResponse.data.checkout_url;
     } catch (error) {
       console.error('Checkout error:', error);
-      toast.error('Failed to process checkout. Please try again.');
+      toast.error(error.response?.data?.detail || 'Failed to process checkout. Please try again.');
       setLoading(false);
     }
   };
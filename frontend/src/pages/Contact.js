@@ -8,6 +8,7 @@ import { Textarea } from '../components/ui/textarea';
 import { Label } from '../components/ui/label';
 import { toast } from 'sonner';
 import { useLanguage } from '../context/LanguageContext';
+import { useStorefront } from '../context/StorefrontContext';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
 
@@ -23,6 +24,7 @@ const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 export default function Contact() {
   const { t } = useLanguage();
+  const { settings } = useStorefront();
   const [formData, setFormData] = useState({
     name: '',
     email: '',
@@ -41,17 +43,10 @@ export default function Contact() {
   });
 
   useEffect(() => {
-    fetchContactSettings();
-  }, []);
-
-  const fetchContactSettings = async () => {
-    try {
-      const response = await axios.get(`${API}/settings/contact`);
-      setContactSettings(response.data);
-    } catch (error) {
-      console.error('Error fetching contact settings:', error);
+    if (settings.contact) {
+      setContactSettings(settings.contact);
     }
-  };
+  }, [settings.contact]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -1,32 +1,13 @@
-import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
 import { ArrowRight, Zap, Shield, Clock } from 'lucide-react';
 import { Button } from '../components/ui/button';
 import ProductCard from '../components/ProductCard';
 import { useLanguage } from '../context/LanguageContext';
-
-const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+import { useStorefront } from '../context/StorefrontContext';
 
 export default function Home() {
   const { t } = useLanguage();
-  const [featuredProducts, setFeaturedProducts] = useState([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    fetchFeaturedProducts();
-  }, []);
-
-  const fetchFeaturedProducts = async () => {
-    try {
-      const response = await axios.get(`${API}/products`);
-      setFeaturedProducts(response.data.slice(0, 6));
-    } catch (error) {
-      console.error('Error fetching products:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+  const { featured: featuredProducts, loading } = useStorefront();
 
   const features = [
     { icon: Zap, title: t('feature_quality'), description: t('feature_quality_desc') },
@@ -11,47 +11,94 @@ import {
   SelectValue,
 } from '../components/ui/select';
 import ProductCard from '../components/ProductCard';
+import { useStorefront } from '../context/StorefrontContext';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const SEARCH_DEBOUNCE_MS = 300;
+const SEARCH_PAGE_SIZE = 48;
 
 export default function Products() {
   const [products, setProducts] = useState([]);
-  const [categories, setCategories] = useState([]);
+  const { categories } = useStorefront();
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('all');
+  // ranked matches from the server's search index; null while no search is active
+  const [searchResults, setSearchResults] = useState(null);
+  const [searchCursor, setSearchCursor] = useState(null);
+  const [searching, setSearching] = useState(false);
 
   useEffect(() => {
     fetchProducts();
-    fetchCategories();
   }, []);
 
-  const fetchProducts = async () => {
+  useEffect(() => {
+    const term = search.trim();
+    if (!term) {
+      setSearchResults(null);
+      setSearchCursor(null);
+      return undefined;
+    }
+    let stale = false;
+    const timer = setTimeout(async () => {
+      setSearching(true);
+      try {
+        const response = await fetchSearchPage(term, null);
+        if (!stale) {
+          setSearchResults(response.data.items);
+          setSearchCursor(response.data.next_cursor);
+        }
+      } catch (error) {
+        console.error('Error searching products:', error);
+      } finally {
+        if (!stale) setSearching(false);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      stale = true;
+      clearTimeout(timer);
+    };
+  }, [search, selectedCategory]);
+
+  const fetchSearchPage = (term, cursor) => axios.get(`${API}/products`, {
+    params: {
+      view: 'grid',
+      search: term,
+      limit: SEARCH_PAGE_SIZE,
+      ...(cursor && { cursor }),
+      ...(selectedCategory !== 'all' && { category: selectedCategory })
+    }
+  });
+
+  const loadMoreResults = async () => {
+    if (!searchCursor) return;
+    setSearching(true);
     try {
-      const response = await axios.get(`${API}/products`);
-      setProducts(response.data);
+      const response = await fetchSearchPage(search.trim(), searchCursor);
+      setSearchResults(prev => [...prev, ...response.data.items]);
+      setSearchCursor(response.data.next_cursor);
     } catch (error) {
-      console.error('Error fetching products:', error);
+      console.error('Error searching products:', error);
     } finally {
-      setLoading(false);
+      setSearching(false);
     }
   };
 
-  const fetchCategories = async () => {
+  const fetchProducts = async () => {
     try {
-      const response = await axios.get(`${API}/categories`);
-      setCategories(response.data);
+      const response = await axios.get(`${API}/products`, { params: { view: 'grid' } });
+      setProducts(response.data);
     } catch (error) {
-      console.error('Error fetching categories:', error);
+      console.error('Error fetching products:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
-  const filteredProducts = products.filter(product => {
-    const matchesSearch = product.name.toLowerCase().includes(search.toLowerCase()) ||
-                         product.description.toLowerCase().includes(search.toLowerCase());
-    const matchesCategory = selectedCategory === 'all' || product.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
+  // grid descriptions are trimmed, so text search runs on the server against the full product
+  const filteredProducts = searchResults ?? products.filter(product =>
+    selectedCategory === 'all' || product.category === selectedCategory
+  );
 
   return (
     <main className="pt-20 min-h-screen" data-testid="products-page">
@@ -93,11 +140,11 @@ export default function Products() {
                   <SelectItem value="all" className="text-[#E7F0FA] focus:bg-[#2E5E99] focus:text-[#E7F0FA]">All Categories</SelectItem>
                   {categories.map((category) => (
                     <SelectItem 
-                      key={category} 
-                      value={category}
+                      key={category.name} 
+                      value={category.name}
                       className="text-[#E7F0FA] focus:bg-[#2E5E99] focus:text-[#E7F0FA]"
                     >
-                      {category}
+                      {category.name} ({category.count})
                     </SelectItem>
                   ))}
                 </SelectContent>
@@ -110,7 +157,7 @@ export default function Products() {
       {/* Products Grid */}
       <section className="py-16">
         <div className="max-w-7xl mx-auto px-6 md:px-12">
-          {loading ? (
+          {loading || (searching && searchResults === null) ? (
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
               {[...Array(6)].map((_, i) => (
                 <div key={i} className="bg-[#132D4E] animate-pulse h-96"></div>
@@ -126,6 +173,19 @@ export default function Products() {
                   <ProductCard key={product.id} product={product} />
                 ))}
               </div>
+              {searchResults && searchCursor && (
+                <div className="flex justify-center mt-12">
+                  <Button
+                    onClick={loadMoreResults}
+                    disabled={searching}
+                    variant="outline"
+                    className="border-[#2E5E99] text-[#E7F0FA] hover:bg-[#2E5E99]/20"
+                    data-testid="load-more-results"
+                  >
+                    {searching ? 'Loading...' : 'Load more results'}
+                  </Button>
+                </div>
+              )}
             </>
           ) : (
             <div className="text-center py-16">
@@ -10,6 +10,7 @@ const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 export default function AdminAnalytics() {
   const { getAuthHeader } = useAuth();
   const [analytics, setAnalytics] = useState(null);
+  const [sales, setSales] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -18,10 +19,12 @@ export default function AdminAnalytics() {
 
   const fetchAnalytics = async () => {
     try {
-      const response = await axios.get(`${API}/analytics`, {
-        headers: getAuthHeader()
-      });
+      const [response, salesResponse] = await Promise.all([
+        axios.get(`${API}/analytics`, { headers: getAuthHeader() }),
+        axios.get(`${API}/analytics/sales`, { headers: getAuthHeader(), params: { granularity: 'day' } })
+      ]);
       setAnalytics(response.data);
+      setSales(salesResponse.data);
     } catch (error) {
       console.error('Error fetching analytics:', error);
     } finally {
@@ -36,6 +39,11 @@ export default function AdminAnalytics() {
     value: parseFloat(value.toFixed(2))
   })) : [];
 
+  const dailyRevenueData = sales ? sales.series.map((point) => ({
+    name: point.bucket.slice(5, 10),
+    value: parseFloat(point.revenue.toFixed(2))
+  })) : [];
+
   const orderStatusData = analytics ? [
     { name: 'Pending', value: analytics.pending_orders },
     { name: 'Confirmed', value: analytics.confirmed_orders },
@@ -163,6 +171,35 @@ export default function AdminAnalytics() {
               </div>
             </div>
 
+            {/* Daily Revenue */}
+            <div className="bg-[#132D4E] border border-white/5 p-6 mt-6">
+              <h2 className="font-heading font-bold text-xl text-[#E7F0FA] mb-6">Revenue (Last 30 Days)</h2>
+              {dailyRevenueData.some(d => d.value > 0) ? (
+                <div className="h-80">
+                  <ResponsiveContainer width="100%" height="100%">
+                    <BarChart data={dailyRevenueData}>
+                      <CartesianGrid strokeDasharray="3 3" stroke="#2E5E99" opacity={0.3} />
+                      <XAxis 
+                        dataKey="name" 
+                        tick={{ fill: '#7BA4D0', fontSize: 12 }}
+                        axisLine={{ stroke: '#2E5E99' }}
+                      />
+                      <YAxis 
+                        tick={{ fill: '#7BA4D0', fontSize: 12 }}
+                        axisLine={{ stroke: '#2E5E99' }}
+                      />
+                      <Tooltip content={<CustomTooltip />} />
+                      <Bar dataKey="value" fill="#2E5E99" radius={[4, 4, 0, 0]} />
+                    </BarChart>
+                  </ResponsiveContainer>
+                </div>
+              ) : (
+                <div className="h-80 flex items-center justify-center text-[#7BA4D0]">
+                  No sales data available
+                </div>
+              )}
+            </div>
+
             {/* Quick Stats */}
             <div className="grid grid-cols-1 md:grid-cols-3 gap-6 mt-6">
               <div className="bg-[#132D4E] border border-white/5 p-6">
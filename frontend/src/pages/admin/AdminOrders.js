@@ -24,10 +24,11 @@ import {
   DialogHeader,
   DialogTitle,
 } from '../../components/ui/dialog';
-import { Eye, Package } from 'lucide-react';
+import { Eye, Package, Download } from 'lucide-react';
 import { toast } from 'sonner';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const PAGE_SIZE = 50;
 
 export default function AdminOrders() {
   const { getAuthHeader } = useAuth();
@@ -35,17 +36,31 @@ export default function AdminOrders() {
   const [loading, setLoading] = useState(true);
   const [statusFilter, setStatusFilter] = useState('all');
   const [selectedOrder, setSelectedOrder] = useState(null);
+  const [checkedIds, setCheckedIds] = useState([]);
+  const [bulkStatus, setBulkStatus] = useState('');
+  const [bulkLoading, setBulkLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchOrders();
-  }, []);
+  }, [statusFilter]);
+
+  // Keyset pages: the filter runs server-side, so older orders beyond the first page stay reachable
+  const fetchPage = (cursor) => axios.get(`${API}/orders`, {
+    params: {
+      limit: PAGE_SIZE,
+      ...(cursor && { cursor }),
+      ...(statusFilter !== 'all' && { status: statusFilter })
+    },
+    headers: getAuthHeader()
+  });
 
   const fetchOrders = async () => {
     try {
-      const response = await axios.get(`${API}/orders`, {
-        headers: getAuthHeader()
-      });
-      setOrders(response.data);
+      const response = await fetchPage(null);
+      setOrders(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching orders:', error);
     } finally {
@@ -53,6 +68,20 @@ export default function AdminOrders() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetchPage(nextCursor);
+      setOrders(prev => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      toast.error('Failed to load more orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateOrderStatus = async (orderId, status) => {
     try {
       await axios.put(`${API}/orders/${orderId}/status`, null, {
@@ -65,7 +94,52 @@ export default function AdminOrders() {
         setSelectedOrder(prev => ({ ...prev, status }));
       }
     } catch (error) {
-      toast.error('Failed to update order status');
+      toast.error(error.response?.data?.detail || 'Failed to update order status');
+    }
+  };
+
+  const toggleChecked = (orderId) => {
+    setCheckedIds(prev => prev.includes(orderId) ? prev.filter(id => id !== orderId) : [...prev, orderId]);
+  };
+
+  const bulkUpdateStatus = async () => {
+    if (!bulkStatus || checkedIds.length === 0) return;
+    setBulkLoading(true);
+    try {
+      const response = await axios.post(`${API}/orders/bulk-status`, {
+        order_ids: checkedIds,
+        status: bulkStatus
+      }, {
+        headers: getAuthHeader()
+      });
+      const { summary } = response.data;
+      const skipped = checkedIds.length - (summary.updated || 0);
+      toast.success(`${summary.updated || 0} order${summary.updated === 1 ? '' : 's'} updated${skipped > 0 ? `, ${skipped} skipped` : ''}`);
+      setCheckedIds([]);
+      setBulkStatus('');
+      fetchOrders();
+    } catch (error) {
+      toast.error(error.response?.data?.detail || 'Failed to update orders');
+    } finally {
+      setBulkLoading(false);
+    }
+  };
+
+  const exportOrders = async (format) => {
+    try {
+      const response = await axios.get(`${API}/admin/export/orders`, {
+        params: { format, ...(statusFilter !== 'all' && { status: statusFilter }) },
+        headers: getAuthHeader(),
+        responseType: 'blob'
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `orders.${format}`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      toast.error('Failed to export orders');
     }
   };
 
@@ -76,11 +150,13 @@ export default function AdminOrders() {
       case 'cancelled': return 'bg-[#FF4D4D]/10 text-[#FF4D4D]';
       case 'shipped': return 'bg-[#7BA4D0]/10 text-[#7BA4D0]';
       case 'delivered': return 'bg-[#00F0FF]/20 text-[#00F0FF]';
+      case 'expired': return 'bg-[#7BA4D0]/10 text-[#7BA4D0]/60';
       default: return 'bg-[#7BA4D0]/10 text-[#7BA4D0]';
     }
   };
 
   const getPaymentColor = (status) => {
+    if (status === 'refund_required') return 'text-[#FF4D4D]';
     return status === 'paid' ? 'text-[#00F0FF]' : 'text-[#FFD700]';
   };
 
@@ -109,26 +185,88 @@ export default function AdminOrders() {
             <p className="text-[#7BA4D0]">Manage customer orders</p>
           </div>
           
-          <Select value={statusFilter} onValueChange={setStatusFilter}>
-            <SelectTrigger className="w-[180px] bg-[#132D4E] border-[#2E5E99]/50 text-[#E7F0FA]" data-testid="status-filter">
-              <SelectValue placeholder="Filter by status" />
-            </SelectTrigger>
-            <SelectContent className="bg-[#132D4E] border-[#2E5E99]">
-              <SelectItem value="all" className="text-[#E7F0FA] focus:bg-[#2E5E99]">All Orders</SelectItem>
-              <SelectItem value="pending" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Pending</SelectItem>
-              <SelectItem value="confirmed" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Confirmed</SelectItem>
-              <SelectItem value="shipped" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Shipped</SelectItem>
-              <SelectItem value="delivered" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Delivered</SelectItem>
-              <SelectItem value="cancelled" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Cancelled</SelectItem>
-            </SelectContent>
-          </Select>
+          <div className="flex items-center gap-3">
+            <Button
+              variant="outline"
+              onClick={() => exportOrders('csv')}
+              className="border-[#2E5E99]/50 text-[#E7F0FA] hover:bg-[#2E5E99]/30"
+              data-testid="export-orders-csv"
+            >
+              <Download className="h-4 w-4 mr-2" />
+              CSV
+            </Button>
+            <Button
+              variant="outline"
+              onClick={() => exportOrders('xlsx')}
+              className="border-[#2E5E99]/50 text-[#E7F0FA] hover:bg-[#2E5E99]/30"
+              data-testid="export-orders-xlsx"
+            >
+              <Download className="h-4 w-4 mr-2" />
+              XLSX
+            </Button>
+            <Select value={statusFilter} onValueChange={setStatusFilter}>
+              <SelectTrigger className="w-[180px] bg-[#132D4E] border-[#2E5E99]/50 text-[#E7F0FA]" data-testid="status-filter">
+                <SelectValue placeholder="Filter by status" />
+              </SelectTrigger>
+              <SelectContent className="bg-[#132D4E] border-[#2E5E99]">
+                <SelectItem value="all" className="text-[#E7F0FA] focus:bg-[#2E5E99]">All Orders</SelectItem>
+                <SelectItem value="pending" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Pending</SelectItem>
+                <SelectItem value="confirmed" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Confirmed</SelectItem>
+                <SelectItem value="shipped" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Shipped</SelectItem>
+                <SelectItem value="delivered" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Delivered</SelectItem>
+                <SelectItem value="cancelled" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Cancelled</SelectItem>
+                <SelectItem value="expired" className="text-[#E7F0FA] focus:bg-[#2E5E99]">Expired</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </div>
 
+        {checkedIds.length > 0 && (
+          <div className="flex items-center gap-3 mb-4 bg-[#132D4E] border border-[#2E5E99]/50 px-4 py-3" data-testid="bulk-actions">
+            <span className="text-[#E7F0FA] text-sm">{checkedIds.length} selected</span>
+            <Select value={bulkStatus} onValueChange={setBulkStatus}>
+              <SelectTrigger className="w-[180px] h-9 bg-[#0A1B30] border-[#2E5E99]/50 text-[#E7F0FA]" data-testid="bulk-status">
+                <SelectValue placeholder="Set status" />
+              </SelectTrigger>
+              <SelectContent className="bg-[#132D4E] border-[#2E5E99]">
+                <SelectItem value="confirmed" className="text-[#00F0FF]">Confirmed</SelectItem>
+                <SelectItem value="shipped" className="text-[#7BA4D0]">Shipped</SelectItem>
+                <SelectItem value="delivered" className="text-[#00F0FF]">Delivered</SelectItem>
+                <SelectItem value="cancelled" className="text-[#FF4D4D]">Cancelled</SelectItem>
+              </SelectContent>
+            </Select>
+            <Button
+              onClick={bulkUpdateStatus}
+              disabled={!bulkStatus || bulkLoading}
+              className="h-9 bg-[#00F0FF] text-[#0D2440] hover:bg-[#00F0FF]/80"
+              data-testid="bulk-apply"
+            >
+              Apply
+            </Button>
+            <Button
+              variant="ghost"
+              onClick={() => setCheckedIds([])}
+              className="h-9 text-[#7BA4D0] hover:text-[#E7F0FA] hover:bg-[#2E5E99]/30"
+            >
+              Clear
+            </Button>
+          </div>
+        )}
+
         {/* Orders Table */}
         <div className="bg-[#132D4E] border border-white/5 overflow-hidden">
           <Table>
             <TableHeader>
               <TableRow className="border-[#2E5E99]/30 hover:bg-transparent">
+                <TableHead className="w-10">
+                  <input
+                    type="checkbox"
+                    className="accent-[#00F0FF]"
+                    checked={filteredOrders.length > 0 && filteredOrders.every(o => checkedIds.includes(o.id))}
+                    onChange={(e) => setCheckedIds(e.target.checked ? filteredOrders.map(o => o.id) : [])}
+                    data-testid="select-all-orders"
+                  />
+                </TableHead>
                 <TableHead className="text-[#7BA4D0]">Order ID</TableHead>
                 <TableHead className="text-[#7BA4D0]">Customer</TableHead>
                 <TableHead className="text-[#7BA4D0]">Total</TableHead>
@@ -142,7 +280,7 @@ export default function AdminOrders() {
               {loading ? (
                 [...Array(5)].map((_, i) => (
                   <TableRow key={i} className="border-[#2E5E99]/30">
-                    <TableCell colSpan={7}>
+                    <TableCell colSpan={8}>
                       <div className="h-12 bg-[#0A1B30] animate-pulse"></div>
                     </TableCell>
                   </TableRow>
@@ -150,6 +288,15 @@ export default function AdminOrders() {
               ) : filteredOrders.length > 0 ? (
                 filteredOrders.map((order) => (
                   <TableRow key={order.id} className="border-[#2E5E99]/30 hover:bg-[#0A1B30]/50">
+                    <TableCell>
+                      <input
+                        type="checkbox"
+                        className="accent-[#00F0FF]"
+                        checked={checkedIds.includes(order.id)}
+                        onChange={() => toggleChecked(order.id)}
+                        data-testid={`select-order-${order.id}`}
+                      />
+                    </TableCell>
                     <TableCell className="font-mono text-[#7BA4D0] text-sm">
                       {order.id.slice(0, 8)}...
                     </TableCell>
@@ -202,7 +349,7 @@ export default function AdminOrders() {
                 ))
               ) : (
                 <TableRow className="border-[#2E5E99]/30">
-                  <TableCell colSpan={7} className="text-center text-[#7BA4D0] py-12">
+                  <TableCell colSpan={8} className="text-center text-[#7BA4D0] py-12">
                     No orders found
                   </TableCell>
                 </TableRow>
@@ -211,6 +358,20 @@ export default function AdminOrders() {
           </Table>
         </div>
 
+        {nextCursor && !loading && (
+          <div className="flex justify-center mt-6">
+            <Button
+              variant="outline"
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="border-[#2E5E99]/50 text-[#E7F0FA] hover:bg-[#2E5E99]/30"
+              data-testid="load-more-orders"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </Button>
+          </div>
+        )}
+
         {/* Order Details Dialog */}
         <Dialog open={!!selectedOrder} onOpenChange={() => setSelectedOrder(null)}>
           <DialogContent className="bg-[#132D4E] border-[#2E5E99] text-[#E7F0FA] max-w-2xl">
@@ -246,6 +407,15 @@ export default function AdminOrders() {
                   </div>
                 </div>
 
+                {selectedOrder.stock_shortfall?.length > 0 && (
+                  <div className="border border-[#FF4D4D]/40 bg-[#FF4D4D]/10 px-4 py-3 text-sm text-[#FF4D4D]" data-testid="stock-shortfall">
+                    Paid without stock for: {selectedOrder.items
+                      .filter(item => selectedOrder.stock_shortfall.includes(item.product_id))
+                      .map(item => item.name)
+                      .join(', ')}
+                  </div>
+                )}
+
                 <div className="border-t border-[#2E5E99]/30 pt-4">
                   <h4 className="font-heading font-bold mb-3">Customer Information</h4>
                   <div className="grid grid-cols-2 gap-4 text-sm">
@@ -88,7 +88,7 @@ export default function AdminProducts() {
       resetForm();
       fetchProducts();
     } catch (error) {
-      toast.error('Failed to save product');
+      toast.error(error.response?.data?.detail || 'Failed to save product');
     }
   };
 
@@ -120,6 +120,18 @@ export default function AdminProducts() {
     setDialogOpen(true);
   };
 
+  const waitForImportJob = async (jobId) => {
+    while (true) {
+      const response = await axios.get(`${API}/products/import-jobs/${jobId}`, {
+        headers: getAuthHeader()
+      });
+      if (response.data.status === 'completed' || response.data.status === 'failed') {
+        return response.data;
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleExcelUpload = async (e) => {
     const file = e.target.files[0];
     if (!file) return;
@@ -134,7 +146,13 @@ export default function AdminProducts() {
           'Content-Type': 'multipart/form-data',
         }
       });
-      toast.success(response.data.message);
+      toast.info(response.data.message);
+      const job = await waitForImportJob(response.data.job_id);
+      if (job.status === 'completed') {
+        toast.success(job.message);
+      } else {
+        toast.error(job.message || 'Import failed');
+      }
       fetchProducts();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Failed to upload file');
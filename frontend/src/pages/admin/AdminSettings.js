@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useAuth } from '../../context/AuthContext';
+import { useStorefront } from '../../context/StorefrontContext';
 import AdminSidebar from '../../components/AdminSidebar';
 import { Button } from '../../components/ui/button';
 import { Input } from '../../components/ui/input';
@@ -14,6 +15,7 @@ const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 export default function AdminSettings() {
   const { getAuthHeader } = useAuth();
+  const { refresh: refreshStorefront } = useStorefront();
   const [loading, setLoading] = useState(false);
   
   const [contactSettings, setContactSettings] = useState({
@@ -66,6 +68,7 @@ export default function AdminSettings() {
       await axios.put(`${API}/settings/contact`, contactSettings, {
         headers: getAuthHeader()
       });
+      refreshStorefront();
       toast.success('Contact settings saved successfully');
     } catch (error) {
       toast.error('Failed to save contact settings');
@@ -80,6 +83,7 @@ export default function AdminSettings() {
       await axios.put(`${API}/settings/about`, aboutContent, {
         headers: getAuthHeader()
       });
+      refreshStorefront();
       toast.success('About content saved successfully');
     } catch (error) {
       toast.error('Failed to save about content');
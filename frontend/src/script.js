@@ -3,6 +3,7 @@ import { Toaster } from "sonner";
 import { CartProvider } from "./context/CartContext";
 import { AuthProvider } from "./context/AuthContext";
 import { LanguageProvider } from "./context/LanguageContext";
+import { StorefrontProvider } from "./context/StorefrontContext";
 import Navbar from "./components/Navbar";
 import Footer from "./components/Footer";
 import Home from "./pages/Home";
@@ -28,40 +29,42 @@ function App() {
     <LanguageProvider>
       <AuthProvider>
         <CartProvider>
-          <BrowserRouter>
-            <div className="min-h-screen bg-[#0D2440] flex flex-col">
-              <Routes>
-                {/* Public Routes */}
-                <Route path="/" element={<><Navbar /><Home /><Footer /></>} />
-                <Route path="/products" element={<><Navbar /><Products /><Footer /></>} />
-                <Route path="/products/:id" element={<><Navbar /><ProductDetail /><Footer /></>} />
-                <Route path="/about" element={<><Navbar /><About /><Footer /></>} />
-                <Route path="/contact" element={<><Navbar /><Contact /><Footer /></>} />
-                <Route path="/cart" element={<><Navbar /><Cart /><Footer /></>} />
-                <Route path="/checkout" element={<><Navbar /><Checkout /><Footer /></>} />
-                <Route path="/payment/success" element={<><Navbar /><PaymentSuccess /><Footer /></>} />
-                <Route path="/payment/cancel" element={<><Navbar /><PaymentCancel /><Footer /></>} />
+          <StorefrontProvider>
+            <BrowserRouter>
+              <div className="min-h-screen bg-[#0D2440] flex flex-col">
+                <Routes>
+                  {/* Public Routes */}
+                  <Route path="/" element={<><Navbar /><Home /><Footer /></>} />
+                  <Route path="/products" element={<><Navbar /><Products /><Footer /></>} />
+                  <Route path="/products/:id" element={<><Navbar /><ProductDetail /><Footer /></>} />
+                  <Route path="/about" element={<><Navbar /><About /><Footer /></>} />
+                  <Route path="/contact" element={<><Navbar /><Contact /><Footer /></>} />
+                  <Route path="/cart" element={<><Navbar /><Cart /><Footer /></>} />
+                  <Route path="/checkout" element={<><Navbar /><Checkout /><Footer /></>} />
+                  <Route path="/payment/success" element={<><Navbar /><PaymentSuccess /><Footer /></>} />
+                  <Route path="/payment/cancel" element={<><Navbar /><PaymentCancel /><Footer /></>} />
                 
-                {/* Admin Routes */}
-                <Route path="/admin/login" element={<AdminLogin />} />
-                <Route path="/admin" element={<ProtectedRoute><AdminDashboard /></ProtectedRoute>} />
-                <Route path="/admin/products" element={<ProtectedRoute><AdminProducts /></ProtectedRoute>} />
-                <Route path="/admin/orders" element={<ProtectedRoute><AdminOrders /></ProtectedRoute>} />
-                <Route path="/admin/analytics" element={<ProtectedRoute><AdminAnalytics /></ProtectedRoute>} />
-                <Route path="/admin/settings" element={<ProtectedRoute><AdminSettings /></ProtectedRoute>} />
-              </Routes>
-              <Toaster 
-                position="top-right" 
-                toastOptions={{
-                  style: {
-                    background: '#132D4E',
-                    border: '1px solid #2E5E99',
-                    color: '#E7F0FA',
-                  },
-                }}
-              />
-            </div>
-          </BrowserRouter>
+                  {/* Admin Routes */}
+                  <Route path="/admin/login" element={<AdminLogin />} />
+                  <Route path="/admin" element={<ProtectedRoute><AdminDashboard /></ProtectedRoute>} />
+                  <Route path="/admin/products" element={<ProtectedRoute><AdminProducts /></ProtectedRoute>} />
+                  <Route path="/admin/orders" element={<ProtectedRoute><AdminOrders /></ProtectedRoute>} />
+                  <Route path="/admin/analytics" element={<ProtectedRoute><AdminAnalytics /></ProtectedRoute>} />
+                  <Route path="/admin/settings" element={<ProtectedRoute><AdminSettings /></ProtectedRoute>} />
+                </Routes>
+                <Toaster 
+                  position="top-right" 
+                  toastOptions={{
+                    style: {
+                      background: '#132D4E',
+                      border: '1px solid #2E5E99',
+                      color: '#E7F0FA',
+                    },
+                  }}
+                />
+              </div>
+            </BrowserRouter>
+          </StorefrontProvider>
         </CartProvider>
       </AuthProvider>
     </LanguageProvider>